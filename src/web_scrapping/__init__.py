@@ -4,5 +4,15 @@ Parser for current electricity rates from A tu Lado Energía.
 Provides tools to extract consumption and power prices from the company's website.
 """
 
-__all__ = ["parser", "paths"]
+__all__ = [
+    "billing",
+    "memory",
+    "models",
+    "output",
+    "parser",
+    "paths",
+    "records",
+    "replay",
+    "watch",
+]
 __version__ = "0.0.1"
@@ -0,0 +1,351 @@
+"""
+Sharded batch parsing of saved A tu Lado Energía web pages.
+
+Splits a directory of snapshots into shards by a stable hash of their identity, so
+a backfill can be spread over several machines sharing a filesystem. Each shard
+writes checkpointed partial outputs that can be resumed and merged.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import typer
+
+from src.web_scrapping import paths
+from src.web_scrapping.output import atomic_write, write_ndjson
+from src.web_scrapping.watch import parse_snapshot
+
+app = typer.Typer()
+
+RECORDS_FILE = "records.ndjson"
+CHECKPOINT_FILE = "checkpoint.tsv"
+DONE_FILE = "done"
+MERGED_FILE = "merged.ndjson"
+
+
+def parse_shard_spec(spec: str) -> tuple[int, int]:
+    """
+    Parse a shard specification such as "2/8".
+
+    Args:
+        spec (str): The shard index and the number of shards, separated by "/".
+
+    Raises:
+        ValueError: If the specification is not valid.
+
+    Returns:
+        tuple[int, int]: The shard index (starting at 0) and the number of shards.
+    """
+    match = re.fullmatch(r"\s*(\d+)\s*/\s*(\d+)\s*", spec)
+    if not match:
+        raise ValueError(f"Invalid shard '{spec}', expected 'i/N'.")
+    index, count = int(match.group(1)), int(match.group(2))
+    if not 0 <= index < count:
+        raise ValueError(f"Invalid shard '{spec}', expected 0 <= i < N.")
+    return index, count
+
+
+def shard_of(snapshot: str, count: int) -> int:
+    """
+    Return the shard a snapshot belongs to.
+
+    The shard only depends on the identity of the snapshot, so every machine
+    assigns the same snapshots to the same shard.
+
+    Args:
+        snapshot (str): The identity of the snapshot (its path relative to the
+            snapshot directory).
+        count (int): The number of shards.
+
+    Returns:
+        int: The shard index.
+    """
+    digest = hashlib.sha256(snapshot.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count
+
+
+def shard_dir(output_dir: Path, index: int, count: int) -> Path:
+    """
+    Return the directory holding the partial outputs of a shard.
+
+    Args:
+        output_dir (Path): The directory shared by all the shards.
+        index (int): The shard index.
+        count (int): The number of shards.
+
+    Returns:
+        Path: The directory of the shard.
+    """
+    return output_dir / f"shard-{index:04d}-of-{count:04d}"
+
+
+def read_checkpoint(directory: Path) -> tuple[set[str], int]:
+    """
+    Read the checkpoint of a shard.
+
+    The checkpoint holds one line per parsed snapshot, with its identity and the
+    size of the records file once its records were committed. A trailing partial
+    line (from a worker killed while writing it) is ignored.
+
+    Args:
+        directory (Path): The directory of the shard.
+
+    Returns:
+        tuple[set[str], int]: The parsed snapshots and the committed size of the
+            records file.
+    """
+    checkpoint = directory / CHECKPOINT_FILE
+    if not checkpoint.exists():
+        return set(), 0
+    done, committed = set(), 0
+    with open(checkpoint, encoding="utf-8") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break
+            snapshot, size = line.rstrip("\n").rsplit("\t", 1)
+            done.add(snapshot)
+            committed = int(size)
+    return done, committed
+
+
+def read_committed_records(directory: Path) -> list[dict]:
+    """
+    Read the committed records of a shard.
+
+    Args:
+        directory (Path): The directory of the shard.
+
+    Returns:
+        list[dict]: The records written before the last checkpoint.
+    """
+    _, committed = read_checkpoint(directory)
+    records = directory / RECORDS_FILE
+    if not committed or not records.exists():
+        return []
+    with open(records, "rb") as f:
+        data = f.read(committed)
+    return [json.loads(line) for line in data.decode("utf-8").splitlines()]
+
+
+def parse_shard(
+    directory: Path,
+    output_dir: Path,
+    index: int,
+    count: int,
+    plans: list[str],
+    pattern: str = "*.html",
+    workers: int | None = None,
+    chunk_size: int = 64,
+) -> int:
+    """
+    Parse the snapshots of a shard into its partial outputs, resuming if needed.
+
+    Records are appended to the records file of the shard and committed in chunks by
+    appending the parsed snapshots to the checkpoint. On resume, records written
+    after the last checkpoint are truncated and the parsed snapshots are skipped.
+    Once every snapshot of the shard is committed, a completion marker is written,
+    so that `merge_shards` can tell complete shards from killed or running ones.
+
+    Args:
+        directory (Path): The directory holding the snapshots.
+        output_dir (Path): The directory shared by all the shards.
+        index (int): The shard index.
+        count (int): The number of shards.
+        plans (list[str]): The plan names to search for (case-insensitive).
+        pattern (str, optional): The glob pattern of the snapshot files.
+            Defaults to "*.html".
+        workers (int, optional): The number of worker processes.
+            Defaults to the number of CPUs.
+        chunk_size (int, optional): The number of snapshots per checkpoint.
+            Defaults to 64.
+
+    Returns:
+        int: The number of snapshots parsed.
+    """
+    target = shard_dir(output_dir, index, count)
+    target.mkdir(parents=True, exist_ok=True)
+    records, checkpoint = target / RECORDS_FILE, target / CHECKPOINT_FILE
+    (target / DONE_FILE).unlink(missing_ok=True)
+
+    done, committed = read_checkpoint(target)
+    if checkpoint.exists():
+        # Drop a partial line so that new lines are not appended to it
+        data = checkpoint.read_bytes()
+        os.truncate(checkpoint, data.rfind(b"\n") + 1)
+    if records.exists() and records.stat().st_size > committed:
+        os.truncate(records, committed)
+
+    pending = []
+    for path in sorted(directory.glob(pattern)):
+        if not path.is_file():
+            continue
+        snapshot = path.relative_to(directory).as_posix()
+        if snapshot not in done and shard_of(snapshot, count) == index:
+            pending.append(snapshot)
+    if not pending:
+        atomic_write(target / DONE_FILE, "")
+        return 0
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for start in range(0, len(pending), chunk_size):
+            chunk = pending[start : start + chunk_size]
+            results = executor.map(
+                parse_snapshot,
+                [directory / snapshot for snapshot in chunk],
+                chunk,
+                [plans] * len(chunk),
+            )
+            with open(records, "a", encoding="utf-8") as f:
+                for parsed in results:
+                    write_ndjson(parsed, f)
+                os.fsync(f.fileno())
+            size = records.stat().st_size
+            with open(checkpoint, "a", encoding="utf-8") as f:
+                f.writelines(f"{snapshot}\t{size}\n" for snapshot in chunk)
+                f.flush()
+                os.fsync(f.fileno())
+    atomic_write(target / DONE_FILE, "")
+    return len(pending)
+
+
+def merge_shards(
+    output_dir: Path,
+    destination: Path,
+    allow_partial: bool = False,
+) -> int:
+    """
+    Merge the partial outputs of all the shards into a single NDJSON file.
+
+    Records are deduplicated by snapshot and plan, and sorted by them, so the
+    merged file does not depend on how the snapshots were sharded.
+
+    Args:
+        output_dir (Path): The directory shared by all the shards.
+        destination (Path): The merged NDJSON file.
+        allow_partial (bool, optional): Whether to merge the committed records of
+            shards that have not completed (killed or still running).
+            Defaults to False.
+
+    Raises:
+        ValueError: If there are no shards, the shards disagree on the number of
+            shards, some shards are missing, or some shards have not completed
+            (unless `allow_partial`).
+
+    Returns:
+        int: The number of merged records.
+    """
+    shards = {}
+    for directory in sorted(output_dir.glob("shard-*-of-*")):
+        match = re.fullmatch(r"shard-(\d+)-of-(\d+)", directory.name)
+        if match and directory.is_dir():
+            shards[int(match.group(1)), int(match.group(2))] = directory
+    if not shards:
+        raise ValueError(f"No shards found in {output_dir}.")
+    counts = {count for _, count in shards}
+    if len(counts) > 1:
+        raise ValueError(f"Shards with different counts found in {output_dir}.")
+    count = counts.pop()
+    missing = sorted(set(range(count)) - {index for index, _ in shards})
+    if missing:
+        raise ValueError(
+            f"Missing shards {', '.join(f'{i}/{count}' for i in missing)} "
+            f"in {output_dir}."
+        )
+    incomplete = [
+        f"{index}/{count}"
+        for index, count in sorted(shards)
+        if not (shards[index, count] / DONE_FILE).exists()
+    ]
+    if incomplete and not allow_partial:
+        raise ValueError(
+            f"Incomplete shards {', '.join(incomplete)} in {output_dir}; parse them "
+            "again to complete them, or allow partial merges."
+        )
+
+    merged = {}
+    for key in sorted(shards):
+        for record in read_committed_records(shards[key]):
+            merged[record["snapshot"], record["plan"]] = record
+    lines = [
+        json.dumps(merged[key], ensure_ascii=False, separators=(",", ":")) + "\n"
+        for key in sorted(merged)
+    ]
+    atomic_write(destination, "".join(lines))
+    return len(lines)
+
+
+@app.callback()
+def callback() -> None:
+    """Parse saved A tu Lado Energía web pages in shards, and merge the shards."""
+
+
+@app.command("parse")
+def parse_command(
+    directory: Path = typer.Argument(paths.web_dir),
+    shard: str = "0/1",
+    output_dir: Path = paths.data_dir / "shards",
+    plan: list[str] = typer.Option(["milenial"]),
+    pattern: str = "*.html",
+    workers: int | None = None,
+) -> None:
+    """
+    Parse the snapshots of a shard, resuming from its last checkpoint.
+
+    Args:
+        directory (Path, optional): The directory holding the snapshots.
+            Defaults to the web data directory.
+        shard (str, optional): The shard to parse, as "i/N" (0 <= i < N).
+            Defaults to "0/1".
+        output_dir (Path, optional): The directory shared by all the shards.
+            Defaults to "shards" in the data directory.
+        plan (list[str], optional): The plan names to search for (case-insensitive).
+            Can be repeated. Defaults to "milenial".
+        pattern (str, optional): The glob pattern of the snapshot files.
+            Defaults to "*.html".
+        workers (int, optional): The number of worker processes.
+            Defaults to the number of CPUs.
+    """
+    try:
+        index, count = parse_shard_spec(shard)
+        parsed = parse_shard(
+            directory, output_dir, index, count, plan, pattern, workers
+        )
+        print(f"Parsed {parsed} snapshot(s) in shard {shard}", file=sys.stderr)
+    except (ValueError, OSError) as e:
+        print(str(e), file=sys.stderr)
+        raise typer.Exit(1) from e
+
+
+@app.command("merge")
+def merge_command(
+    output_dir: Path = typer.Argument(paths.data_dir / "shards"),
+    destination: Path | None = None,
+    allow_partial: bool = False,
+) -> None:
+    """
+    Merge the partial outputs of all the shards into a single NDJSON file.
+
+    Args:
+        output_dir (Path, optional): The directory shared by all the shards.
+            Defaults to "shards" in the data directory.
+        destination (Path, optional): The merged NDJSON file.
+            Defaults to "merged.ndjson" in the shared directory.
+        allow_partial (bool, optional): Whether to merge the committed records of
+            shards that have not completed. Defaults to False.
+    """
+    destination = destination or output_dir / MERGED_FILE
+    try:
+        merged = merge_shards(output_dir, destination, allow_partial)
+        print(f"Merged {merged} record(s) into {destination}", file=sys.stderr)
+    except (ValueError, OSError) as e:
+        print(str(e), file=sys.stderr)
+        raise typer.Exit(1) from e
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,253 @@
+"""
+Bill calculations for the electricity rates of A tu Lado Energía.
+
+Reduces each customer load profile once to per-period sufficient statistics, so
+that re-pricing every profile against new rates is a single matrix-vector product.
+"""
+
+import json
+import sys
+from array import array
+from collections.abc import Collection, Iterable
+from datetime import date, datetime
+from pathlib import Path
+
+from pydantic import BaseModel, Field
+
+from src.web_scrapping.models import ElectricityRates
+from src.web_scrapping.output import atomic_write
+from src.web_scrapping.records import FIELDS, PERIODS, RatesRecord
+
+AGGREGATES_VERSION = 2
+
+# Hours of each consumption period on working days (2.0TD tariff); weekends and
+# holidays are valley all day long
+PEAK_HOURS = frozenset((10, 11, 12, 13, 18, 19, 20, 21))
+FLAT_HOURS = frozenset((8, 9, 14, 15, 16, 17, 22, 23))
+
+
+def consumption_period(moment: datetime, holidays: Collection[date] = ()) -> str:
+    """
+    Return the consumption period of an hour.
+
+    Args:
+        moment (datetime): The start of the hour, in local time.
+        holidays (Collection[date], optional): National holidays, billed as valley.
+            Defaults to none.
+
+    Returns:
+        str: The period ("peak", "flat" or "valley").
+    """
+    if moment.weekday() >= 5 or moment.date() in holidays:
+        return "valley"
+    if moment.hour in PEAK_HOURS:
+        return "peak"
+    if moment.hour in FLAT_HOURS:
+        return "flat"
+    return "valley"
+
+
+class ProfileAggregates(BaseModel):
+    """
+    Model for the sufficient statistics of a load profile over a billing period.
+
+    The power term of the 2.0TD tariff has two periods: P1 (peak and flat) and P2
+    (valley), each with its own contracted power.
+    """
+
+    energy_peak: float = Field(0.0, ge=0, description="Peak consumption (kWh)")
+    energy_flat: float = Field(0.0, ge=0, description="Flat consumption (kWh)")
+    energy_valley: float = Field(0.0, ge=0, description="Valley consumption (kWh)")
+    power_p1: float = Field(0.0, ge=0, description="P1 (peak and flat) power (kW)")
+    power_p2: float = Field(0.0, ge=0, description="P2 (valley) power (kW)")
+    days: int = Field(0, ge=0, description="Billing days")
+
+    def coefficients(self) -> tuple[float, ...]:
+        """
+        Return the coefficients of the bill for each rate, in `FIELDS` order.
+
+        The bill is the dot product of these coefficients (kWh per period and
+        contracted kW times billing days per power period) with the rate values.
+        The website publishes the P1 power rate as both the peak and the flat power
+        rates, so P1 is charged through the peak rate only and the flat power
+        coefficient is zero.
+
+        Returns:
+            tuple[float, ...]: The six coefficients.
+        """
+        return (
+            self.energy_peak,
+            self.energy_flat,
+            self.energy_valley,
+            self.power_p1 * self.days,
+            0.0,
+            self.power_p2 * self.days,
+        )
+
+    def price(self, rates: ElectricityRates) -> float:
+        """
+        Return the bill of the profile for the given rates.
+
+        Args:
+            rates (ElectricityRates): The electricity rates.
+
+        Returns:
+            float: The bill in €, without taxes.
+        """
+        values = RatesRecord.from_rates(rates).values()
+        return sum(c * v for c, v in zip(self.coefficients(), values, strict=True))
+
+
+def aggregate_profile(
+    readings: Iterable[tuple[datetime, float]],
+    start: date,
+    end: date,
+    power_p1: float,
+    power_p2: float,
+    holidays: Collection[date] = (),
+) -> ProfileAggregates:
+    """
+    Reduce the hourly readings of a load profile to its sufficient statistics.
+
+    Args:
+        readings (Iterable[tuple[datetime, float]]): The start of each hour, in local
+            time, and the energy consumed in it (kWh).
+        start (date): The first day of the billing period.
+        end (date): The last day of the billing period (included).
+        power_p1 (float): The contracted power of P1, peak and flat (kW).
+        power_p2 (float): The contracted power of P2, valley (kW).
+        holidays (Collection[date], optional): National holidays, billed as valley.
+            Defaults to none.
+
+    Raises:
+        ValueError: If the billing period ends before it starts, or a reading falls
+            outside of it.
+
+    Returns:
+        ProfileAggregates: The consumption per period, contracted power per power
+            period and number of billing days of the profile.
+    """
+    if end < start:
+        raise ValueError(f"The billing period ends ({end}) before it starts ({start}).")
+    energy = dict.fromkeys(PERIODS, 0.0)
+    for moment, kwh in readings:
+        if not start <= moment.date() <= end:
+            raise ValueError(
+                f"Reading at {moment} outside of the billing period {start} - {end}."
+            )
+        energy[consumption_period(moment, holidays)] += kwh
+    return ProfileAggregates(
+        energy_peak=energy["peak"],
+        energy_flat=energy["flat"],
+        energy_valley=energy["valley"],
+        power_p1=power_p1,
+        power_p2=power_p2,
+        days=(end - start).days + 1,
+    )
+
+
+class AggregateStore:
+    """
+    Bill coefficients of many load profiles, stored in a flat `array("d")`.
+
+    Each profile takes six values in `FIELDS` order (see
+    `ProfileAggregates.coefficients`), so pricing every profile against new rates
+    only needs the six rate values.
+    """
+
+    __slots__ = ("_coefficients", "ids")
+
+    def __init__(self) -> None:
+        """Create an empty store."""
+        self.ids: list[str] = []
+        self._coefficients = array("d")
+
+    def add(self, profile_id: str, aggregates: ProfileAggregates) -> None:
+        """
+        Add the aggregates of a load profile to the store.
+
+        Args:
+            profile_id (str): The identity of the profile (e.g. the CUPS).
+            aggregates (ProfileAggregates): The aggregates of the profile.
+        """
+        self.ids.append(profile_id)
+        self._coefficients.extend(aggregates.coefficients())
+
+    def price(self, rates: ElectricityRates) -> list[float]:
+        """
+        Return the bill of every profile for the given rates.
+
+        Args:
+            rates (ElectricityRates): The electricity rates.
+
+        Returns:
+            list[float]: The bill of each profile in €, without taxes, in the order
+                the profiles were added.
+        """
+        width = len(FIELDS)
+        r0, r1, r2, r3, r4, r5 = RatesRecord.from_rates(rates).values()
+        columns = [self._coefficients[j::width] for j in range(width)]
+        return [
+            c0 * r0 + c1 * r1 + c2 * r2 + c3 * r3 + c4 * r4 + c5 * r5
+            for c0, c1, c2, c3, c4, c5 in zip(*columns, strict=True)
+        ]
+
+    def bills(self, rates: ElectricityRates) -> dict[str, float]:
+        """
+        Return the bill of every profile for the given rates, by profile identity.
+
+        Args:
+            rates (ElectricityRates): The electricity rates.
+
+        Returns:
+            dict[str, float]: The bill of each profile in €, without taxes.
+        """
+        return dict(zip(self.ids, self.price(rates), strict=True))
+
+    def save(self, path: Path) -> None:
+        """
+        Save the store to a file atomically.
+
+        The file holds a JSON header line with the profile identities followed by
+        the coefficients as little-endian float64 values.
+
+        Args:
+            path (Path): The destination file.
+        """
+        header = json.dumps({"version": AGGREGATES_VERSION, "ids": self.ids})
+        coefficients = array("d", self._coefficients)
+        if sys.byteorder != "little":
+            coefficients.byteswap()
+        atomic_write(path, header.encode("utf-8") + b"\n" + coefficients.tobytes())
+
+    @classmethod
+    def load(cls, path: Path) -> "AggregateStore":
+        """
+        Load a store from a file.
+
+        Args:
+            path (Path): The file, as written by `save`.
+
+        Raises:
+            ValueError: If the file is not in the expected format.
+
+        Returns:
+            AggregateStore: The loaded store.
+        """
+        data = path.read_bytes()
+        header, _, payload = data.partition(b"\n")
+        meta = json.loads(header)
+        if meta.get("version") != AGGREGATES_VERSION:
+            raise ValueError(f"Unsupported aggregates version {meta.get('version')}.")
+        store = cls()
+        store.ids = meta["ids"]
+        store._coefficients.frombytes(payload)
+        if sys.byteorder != "little":
+            store._coefficients.byteswap()
+        if len(store._coefficients) != len(store.ids) * len(FIELDS):
+            raise ValueError("The aggregates file is truncated or corrupted.")
+        return store
+
+    def __len__(self) -> int:
+        """Return the number of profiles in the store."""
+        return len(self.ids)
@@ -0,0 +1,270 @@
+"""
+Columnar export of electricity rates and derived results.
+
+Flattens parsed plans and historical observations into a long table (plan, section,
+period, value, unit, fetched_at) and writes it as Arrow IPC/Feather or Parquet, with
+dictionary-encoded string columns, so years of rates load with a single memory map.
+"""
+
+import json
+import sys
+from collections.abc import Iterable, Iterator
+from datetime import UTC, datetime
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+import typer
+
+from src.web_scrapping import paths
+from src.web_scrapping.billing import AggregateStore
+from src.web_scrapping.models import ElectricityRates
+from src.web_scrapping.output import (
+    atomic_write,
+    decode_binary,
+    plan_slug,
+    rates_record,
+)
+from src.web_scrapping.records import PERIODS, SECTIONS
+
+app = typer.Typer()
+
+_DICTIONARY = pa.dictionary(pa.int32(), pa.string())
+
+RATES_SCHEMA = pa.schema(
+    [
+        ("plan", _DICTIONARY),
+        ("section", _DICTIONARY),
+        ("period", _DICTIONARY),
+        ("value", pa.float64()),
+        ("unit", _DICTIONARY),
+        ("fetched_at", pa.timestamp("us", tz="UTC")),
+    ]
+)
+
+BILLS_SCHEMA = pa.schema(
+    [
+        ("profile_id", pa.string()),
+        ("plan", _DICTIONARY),
+        ("fetched_at", pa.timestamp("us", tz="UTC")),
+        ("bill", pa.float64()),
+    ]
+)
+
+
+def _dictionary_array(values: list[str]) -> pa.DictionaryArray:
+    """Build a dictionary-encoded string array."""
+    return pa.array(values, pa.string()).dictionary_encode().cast(_DICTIONARY)
+
+
+def plan_key(plan: str) -> str:
+    """
+    Return the key identifying a plan across rate files.
+
+    Per-plan JSON files only keep the slug of the plan name, while NDJSON and binary
+    files keep the name as typed, so every name is reduced to its lowercase slug
+    (plan names are matched case-insensitively when parsing).
+
+    Args:
+        plan (str): The plan name or slug.
+
+    Returns:
+        str: The key of the plan, e.g. "discriminacion-horaria".
+    """
+    return plan_slug(plan).lower()
+
+
+def rates_table(records: Iterable[dict]) -> pa.Table:
+    """
+    Flatten rate records into a long table, with one row per section and period.
+
+    Args:
+        records (Iterable[dict]): Records as written by the NDJSON output (with the
+            plan, fetch time and rates by section).
+
+    Returns:
+        pa.Table: The table, following `RATES_SCHEMA`.
+    """
+    columns: dict[str, list] = {name: [] for name in RATES_SCHEMA.names}
+    for record in records:
+        fetched_at = datetime.fromisoformat(record["fetched_at"])
+        for section in SECTIONS:
+            for period in PERIODS:
+                value, unit = record[section][period]
+                columns["plan"].append(record["plan"])
+                columns["section"].append(section)
+                columns["period"].append(period)
+                columns["value"].append(value)
+                columns["unit"].append(unit)
+                columns["fetched_at"].append(fetched_at)
+    return pa.table(
+        [
+            _dictionary_array(columns["plan"]),
+            _dictionary_array(columns["section"]),
+            _dictionary_array(columns["period"]),
+            pa.array(columns["value"], pa.float64()),
+            _dictionary_array(columns["unit"]),
+            pa.array(columns["fetched_at"], pa.timestamp("us", tz="UTC")),
+        ],
+        schema=RATES_SCHEMA,
+    )
+
+
+def bills_table(
+    store: AggregateStore,
+    rates: ElectricityRates,
+    plan: str,
+    fetched_at: datetime | None = None,
+) -> pa.Table:
+    """
+    Price every profile of a store and return the bills as a table.
+
+    Args:
+        store (AggregateStore): The aggregates of the load profiles.
+        rates (ElectricityRates): The electricity rates.
+        plan (str): The plan name of the rates.
+        fetched_at (datetime, optional): When the rates were fetched.
+            Defaults to now.
+
+    Returns:
+        pa.Table: The table, following `BILLS_SCHEMA`.
+    """
+    fetched_at = fetched_at or datetime.now(UTC)
+    return pa.table(
+        [
+            pa.array(store.ids, pa.string()),
+            _dictionary_array([plan] * len(store)),
+            pa.array([fetched_at] * len(store), pa.timestamp("us", tz="UTC")),
+            pa.array(store.price(rates), pa.float64()),
+        ],
+        schema=BILLS_SCHEMA,
+    )
+
+
+def read_records(path: Path) -> Iterator[dict]:
+    """
+    Read the rate records stored in a file.
+
+    Supports the files written by the parser: per-plan JSON files
+    (`<plan>_rates.json`, timestamped with their modification time), NDJSON stores
+    and compact binary files. The plan of each record is normalised with `plan_key`,
+    so a plan gets the same name whatever file it comes from.
+
+    Args:
+        path (Path): The file to read.
+
+    Raises:
+        ValueError: If the file type is not supported, or the file holds a record
+            that is not a rates record.
+
+    Yields:
+        dict: The records, as written by the NDJSON output.
+    """
+    if path.suffix == ".ndjson":
+        with open(path, encoding="utf-8") as f:
+            for number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    plan = record["plan"]
+                    if not isinstance(plan, str):
+                        raise TypeError(f"invalid plan {plan!r}")
+                    fetched_at = datetime.fromisoformat(record["fetched_at"])
+                    rates = ElectricityRates.model_validate(record)
+                except (ValueError, KeyError, TypeError) as e:
+                    raise ValueError(
+                        f"Invalid rates record at line {number} of {path}: {e!r}"
+                    ) from e
+                yield rates_record(plan_key(plan), rates, fetched_at)
+    elif path.suffix == ".bin":
+        plans, fetched_at, batch = decode_binary(path.read_bytes())
+        for plan, moment, rates in zip(
+            plans, fetched_at, batch.to_rates(), strict=True
+        ):
+            yield rates_record(plan_key(plan), rates, moment)
+    elif path.name.endswith("_rates.json"):
+        try:
+            rates = ElectricityRates.model_validate_json(path.read_bytes())
+        except ValueError as e:
+            raise ValueError(f"Invalid rates file {path}: {e}") from e
+        fetched_at = datetime.fromtimestamp(path.stat().st_mtime, UTC)
+        plan = plan_key(path.name.removesuffix("_rates.json"))
+        yield rates_record(plan, rates, fetched_at)
+    else:
+        raise ValueError(f"Unsupported rates file {path}.")
+
+
+def write_table(table: pa.Table, path: Path) -> None:
+    """
+    Write a table as Parquet (".parquet") or Arrow IPC/Feather (any other suffix).
+
+    Arrow files are written uncompressed, so they can be memory-mapped without
+    copying on read. The file is replaced atomically.
+
+    Args:
+        table (pa.Table): The table to write.
+        path (Path): The destination file.
+    """
+    sink = pa.BufferOutputStream()
+    if path.suffix == ".parquet":
+        pq.write_table(table, sink)
+    else:
+        feather.write_feather(table, sink, compression="uncompressed")
+    atomic_write(path, sink.getvalue().to_pybytes())
+
+
+def read_table(path: Path) -> pa.Table:
+    """
+    Read a table written by `write_table`, memory-mapping the file.
+
+    Args:
+        path (Path): The file to read.
+
+    Returns:
+        pa.Table: The table. For Arrow files, its buffers point into the mapped file.
+    """
+    if path.suffix == ".parquet":
+        return pq.read_table(path, memory_map=True)
+    return feather.read_table(path, memory_map=True)
+
+
+@app.command()
+def main(
+    sources: list[Path] = typer.Argument(None),
+    destination: Path = paths.data_dir / "rates.arrow",
+) -> None:
+    """
+    Export rate files to a single columnar file.
+
+    Args:
+        sources (list[Path], optional): The rate files to export (per-plan JSON
+            files, NDJSON stores or compact binary files). Defaults to the rate
+            files written by the parser and the watcher in the data directory
+            (`*_rates.json`, "rates.ndjson" and "rates.bin").
+        destination (Path, optional): The destination file, written as Parquet if
+            its suffix is ".parquet" and as Arrow IPC/Feather otherwise.
+            Defaults to "rates.arrow" in the data directory.
+    """
+    if not sources:
+        sources = sorted(
+            [
+                *paths.data_dir.glob("*_rates.json"),
+                *paths.data_dir.glob("rates.ndjson"),
+                *paths.data_dir.glob("rates.bin"),
+            ]
+        )
+    try:
+        table = rates_table(
+            record for source in sources for record in read_records(source)
+        )
+        write_table(table, destination)
+    except (ValueError, OSError) as e:
+        print(str(e), file=sys.stderr)
+        raise typer.Exit(1) from e
+    print(f"Exported {table.num_rows} row(s) to {destination}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    app()
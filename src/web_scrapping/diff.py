@@ -0,0 +1,264 @@
+"""
+Detection of changes in the electricity rates of A tu Lado Energía.
+
+Compares newly parsed rates against the last stored ones and emits one change event
+per plan, section and period that moved, to pluggable local sinks.
+"""
+
+import json
+import sys
+import urllib.request
+from collections.abc import Iterable
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import IO
+
+from pydantic import BaseModel
+
+from src.web_scrapping.models import ElectricityRates
+from src.web_scrapping.output import atomic_write, write_ndjson
+from src.web_scrapping.records import FIELDS, UNITS, RatesRecord
+
+
+class RateChange(BaseModel):
+    """Model for the change of a rate between two observations."""
+
+    plan: str
+    section: str
+    period: str
+    unit: str
+    old: float | None
+    new: float
+    delta: float | None
+    relative_delta: float | None
+    timestamp: datetime
+
+
+class NdjsonFileSink:
+    """Append change events to an NDJSON file."""
+
+    def __init__(self, path: Path) -> None:
+        """
+        Create a sink writing to a file.
+
+        Args:
+            path (Path): The NDJSON file the events are appended to.
+        """
+        self.path = path
+
+    def emit(self, events: list[RateChange]) -> None:
+        """
+        Append the events to the file.
+
+        Args:
+            events (list[RateChange]): The change events.
+        """
+        with open(self.path, "a", encoding="utf-8") as f:
+            write_ndjson((event.model_dump(mode="json") for event in events), f)
+
+
+class StreamSink:
+    """Write change events to a text stream as NDJSON."""
+
+    def __init__(self, stream: IO[str] | None = None) -> None:
+        """
+        Create a sink writing to a stream.
+
+        Args:
+            stream (IO[str], optional): The text stream. Defaults to stdout.
+        """
+        self.stream = stream
+
+    def emit(self, events: list[RateChange]) -> None:
+        """
+        Write the events to the stream.
+
+        Args:
+            events (list[RateChange]): The change events.
+        """
+        write_ndjson(
+            (event.model_dump(mode="json") for event in events),
+            self.stream or sys.stdout,
+        )
+
+
+class WebhookSink:
+    """POST change events as a JSON array to a (local) webhook."""
+
+    def __init__(self, url: str, timeout: float = 10) -> None:
+        """
+        Create a sink posting to a URL.
+
+        Args:
+            url (str): The URL of the webhook (http or https).
+            timeout (float, optional): Seconds to wait for the webhook.
+                Defaults to 10.
+
+        Raises:
+            ValueError: If the URL is not an http or https URL.
+        """
+        if not url.startswith(("http://", "https://")):
+            raise ValueError(f"Invalid webhook URL '{url}'.")
+        self.url = url
+        self.timeout = timeout
+
+    def emit(self, events: list[RateChange]) -> None:
+        """
+        Post the events to the webhook.
+
+        Args:
+            events (list[RateChange]): The change events.
+        """
+        body = json.dumps(
+            [event.model_dump(mode="json") for event in events], ensure_ascii=False
+        ).encode("utf-8")
+        request = urllib.request.Request(  # noqa: S310
+            self.url,
+            data=body,
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):  # noqa: S310
+            pass
+
+
+ChangeSink = NdjsonFileSink | StreamSink | WebhookSink
+
+
+def sink_from_spec(spec: str, stream: IO[str] | None = None) -> ChangeSink:
+    """
+    Create a sink from its command line specification.
+
+    Args:
+        spec (str): "-" for the standard stream, an http(s) URL for a webhook, or
+            the path of an NDJSON file.
+        stream (IO[str], optional): The text stream "-" stands for.
+            Defaults to stdout.
+
+    Returns:
+        ChangeSink: The sink.
+    """
+    if spec == "-":
+        return StreamSink(stream)
+    if spec.startswith(("http://", "https://")):
+        return WebhookSink(spec)
+    return NdjsonFileSink(Path(spec))
+
+
+class RatesDiffer:
+    """
+    Compare new rates against the last stored ones and emit the changes.
+
+    The last rate values of each plan are kept in a small state file, loaded once,
+    so comparing a new observation costs a single tuple comparison when nothing
+    changed.
+    """
+
+    def __init__(self, state_path: Path, sinks: Iterable[ChangeSink] = ()) -> None:
+        """
+        Create a differ.
+
+        Args:
+            state_path (Path): The JSON file holding the last rate values of each plan.
+            sinks (Iterable[ChangeSink], optional): Where the change events are
+                emitted. Defaults to none.
+        """
+        self.state_path = state_path
+        self.sinks = list(sinks)
+        self._state: dict[str, tuple[float, ...] | None] = {}
+        if state_path.exists():
+            state = json.loads(state_path.read_text(encoding="utf-8"))
+            self._state = {
+                plan: None if values is None else tuple(values)
+                for plan, values in state.items()
+            }
+
+    def __contains__(self, plan: str) -> bool:
+        """Return whether the differ has previous rates for a plan."""
+        return plan in self._state
+
+    def _save(self) -> None:
+        """Save the last rate values of each plan to the state file."""
+        atomic_write(
+            self.state_path,
+            json.dumps(
+                {
+                    p: None if values is None else list(values)
+                    for p, values in self._state.items()
+                }
+            ),
+        )
+
+    def seed(self, plan: str, rates: ElectricityRates | None) -> None:
+        """
+        Set and save the previous rates of a plan without emitting any event.
+
+        Args:
+            plan (str): The plan name.
+            rates (ElectricityRates | None): The previous rates of the plan, or None
+                if it has none (so its first rates are all emitted as changes, even
+                if they were stored elsewhere before being emitted).
+        """
+        self._state[plan] = (
+            None if rates is None else RatesRecord.from_rates(rates).values()
+        )
+        self._save()
+
+    def update(
+        self,
+        plan: str,
+        rates: ElectricityRates,
+        timestamp: datetime | None = None,
+    ) -> list[RateChange]:
+        """
+        Compare new rates against the previous ones and emit the changes.
+
+        The new rates are stored only after every sink emitted the events. If a
+        sink fails, its error is raised and the previous rates are kept, so the same
+        events are emitted again by the next update (sinks that succeeded before
+        the failure receive them twice).
+
+        Args:
+            plan (str): The plan name.
+            rates (ElectricityRates): The new rates of the plan.
+            timestamp (datetime, optional): When the new rates were fetched.
+                Defaults to now.
+
+        Returns:
+            list[RateChange]: One event per section and period whose rate changed
+                (every rate of a plan without previous rates).
+        """
+        new = RatesRecord.from_rates(rates).values()
+        old = self._state.get(plan)
+        if old == new:
+            return []
+
+        timestamp = timestamp or datetime.now(UTC)
+        events = []
+        for i, field in enumerate(FIELDS):
+            old_value = old[i] if old else None
+            if old_value == new[i]:
+                continue
+            section, period = field.split("_", 1)
+            delta = None if old_value is None else new[i] - old_value
+            events.append(
+                RateChange(
+                    plan=plan,
+                    section=section,
+                    period=period,
+                    unit=UNITS[section],
+                    old=old_value,
+                    new=new[i],
+                    delta=delta,
+                    relative_delta=delta / old_value if old_value else None,
+                    timestamp=timestamp,
+                )
+            )
+
+        # Persist the new rates only once every sink got the events, so a failed
+        # delivery is retried by the next update (at-least-once)
+        for sink in self.sinks:
+            sink.emit(events)
+        self._state[plan] = new
+        self._save()
+        return events
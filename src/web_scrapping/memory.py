@@ -0,0 +1,188 @@
+"""
+Memory accounting for the browser used to load the A tu Lado Energía website.
+
+Provides process-tree RSS sampling based on `/proc`, and a monitor that enforces a
+memory budget while a page is being loaded. On systems without `/proc`, the RSS is
+reported as zero and no budget is enforced.
+"""
+
+import contextlib
+import os
+import signal
+import threading
+from collections.abc import Callable
+from pathlib import Path
+from types import TracebackType
+
+from pydantic import BaseModel
+
+PROC_ROOT = Path("/proc")
+
+
+class MemoryStats(BaseModel):
+    """Model for the memory usage of the browser during a fetch."""
+
+    peak_bytes: int = 0
+    samples: int = 0
+    recycles: int = 0
+
+    @property
+    def peak_mb(self) -> float:
+        """Peak resident memory in MB."""
+        return self.peak_bytes / 2**20
+
+
+def _children(proc_root: Path) -> dict[int, list[int]]:
+    """Map each process id to the ids of its children."""
+    children: dict[int, list[int]] = {}
+    for stat in proc_root.glob("[0-9]*/stat"):
+        try:
+            content = stat.read_text()
+        except OSError:
+            # The process exited while we were scanning
+            continue
+        # The command name is between parentheses and may contain spaces
+        fields = content.rsplit(")", 1)[1].split()
+        children.setdefault(int(fields[1]), []).append(int(stat.parent.name))
+    return children
+
+
+def process_tree(pid: int, proc_root: Path = PROC_ROOT) -> list[int]:
+    """
+    Return the ids of a process and all its descendants.
+
+    Args:
+        pid (int): The id of the root process.
+        proc_root (Path, optional): The procfs mount point. Defaults to "/proc".
+
+    Returns:
+        list[int]: The process ids, starting with the root process.
+    """
+    children = _children(proc_root)
+    tree, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        tree.append(current)
+        pending.extend(children.get(current, []))
+    return tree
+
+
+def process_tree_rss(pid: int, proc_root: Path = PROC_ROOT) -> int:
+    """
+    Return the resident memory of a process and all its descendants.
+
+    Args:
+        pid (int): The id of the root process.
+        proc_root (Path, optional): The procfs mount point. Defaults to "/proc".
+
+    Returns:
+        int: The resident memory in bytes, or 0 if `/proc` is not available.
+    """
+    if not proc_root.is_dir():
+        return 0
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    rss = 0
+    for child in process_tree(pid, proc_root):
+        try:
+            rss += int((proc_root / str(child) / "statm").read_text().split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+    return rss * page_size
+
+
+def kill_process_tree(pid: int, include_root: bool = False) -> None:
+    """
+    Kill all the descendants of a process, and optionally the process itself.
+
+    Args:
+        pid (int): The id of the root process.
+        include_root (bool, optional): Whether to kill the root process too.
+            Defaults to False.
+    """
+    if not PROC_ROOT.is_dir():
+        return
+    tree = process_tree(pid)
+    for child in tree if include_root else tree[1:]:
+        with contextlib.suppress(ProcessLookupError, PermissionError):
+            os.kill(child, signal.SIGKILL)
+
+
+class MemoryMonitor:
+    """
+    Sample the RSS of a process tree in a background thread.
+
+    Use it as a context manager around the code that should be monitored. When a
+    budget is set and the RSS exceeds it, `on_exceed` is called once from the
+    sampling thread and `exceeded` is set.
+    """
+
+    def __init__(
+        self,
+        pid: int,
+        budget_bytes: int | None = None,
+        on_exceed: Callable[[], None] | None = None,
+        interval: float = 0.2,
+        stats: MemoryStats | None = None,
+    ) -> None:
+        """
+        Create a monitor for a process tree.
+
+        Args:
+            pid (int): The id of the root process.
+            budget_bytes (int, optional): The memory budget in bytes.
+                Defaults to no budget.
+            on_exceed (Callable[[], None], optional): Called when the budget is
+                exceeded. Defaults to nothing.
+            interval (float, optional): Seconds between samples. Defaults to 0.2.
+            stats (MemoryStats, optional): Statistics to update with the samples.
+                Defaults to new statistics.
+        """
+        self.pid = pid
+        self.budget_bytes = budget_bytes
+        self.on_exceed = on_exceed
+        self.interval = interval
+        self.stats = stats or MemoryStats()
+        self.exceeded = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def sample(self) -> int:
+        """
+        Take a sample of the RSS of the process tree and update the statistics.
+
+        Returns:
+            int: The resident memory in bytes.
+        """
+        rss = process_tree_rss(self.pid)
+        self.stats.samples += 1
+        self.stats.peak_bytes = max(self.stats.peak_bytes, rss)
+        if (
+            self.budget_bytes is not None
+            and rss > self.budget_bytes
+            and not self.exceeded
+        ):
+            self.exceeded = True
+            if self.on_exceed:
+                self.on_exceed()
+        return rss
+
+    def _run(self) -> None:
+        """Sample the process tree until the monitor is stopped."""
+        while not self._stop.is_set():
+            self.sample()
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "MemoryMonitor":
+        """Start sampling in the background."""
+        self._thread.start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Stop sampling."""
+        self._stop.set()
+        self._thread.join()
@@ -0,0 +1,55 @@
+"""
+Models for the electricity rates of A tu Lado Energía.
+
+Validate the consumption and power prices parsed from the company's website.
+"""
+
+from pydantic import BaseModel, Field, field_validator
+
+CONSUMPTION_UNIT = "€/kWh"
+POWER_UNIT = "€/kW day"
+
+
+class ConsumptionRates(BaseModel):
+    """Model for consumption rates."""
+
+    peak: tuple[float, str] = Field(description="Peak rate (value, unit)")
+    flat: tuple[float, str] = Field(description="Flat rate (value, unit)")
+    valley: tuple[float, str] = Field(description="Valley rate (value, unit)")
+
+    @field_validator("peak", "flat", "valley")
+    @classmethod
+    def validate_period(cls, v: tuple[float, str]) -> tuple[float, str]:
+        """Validate that consumption rates use €/kWh and have positive values."""
+        value, unit = v
+        if value <= 0:
+            raise ValueError("Consumption rate values must be positive")
+        if unit != CONSUMPTION_UNIT:
+            raise ValueError(f"Consumption rate units must be {CONSUMPTION_UNIT}")
+        return v
+
+
+class PowerRates(BaseModel):
+    """Model for power rates."""
+
+    peak: tuple[float, str] = Field(description="Peak rate (value, unit)")
+    flat: tuple[float, str] = Field(description="Flat rate (value, unit)")
+    valley: tuple[float, str] = Field(description="Valley rate (value, unit)")
+
+    @field_validator("peak", "flat", "valley")
+    @classmethod
+    def validate_period(cls, v: tuple[float, str]) -> tuple[float, str]:
+        """Validate that power rates use €/kW day and have positive values."""
+        value, unit = v
+        if value <= 0:
+            raise ValueError("Power rate values must be positive")
+        if unit != POWER_UNIT:
+            raise ValueError(f"Power rate units must be {POWER_UNIT}")
+        return v
+
+
+class ElectricityRates(BaseModel):
+    """Model for electricity rates."""
+
+    consumption: ConsumptionRates
+    power: PowerRates
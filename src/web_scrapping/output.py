@@ -0,0 +1,212 @@
+"""
+Output sinks for parsed electricity rates.
+
+Provides the encodings supported by the command line interface (pretty and compact
+JSON, NDJSON and a compact binary format) and atomic file writes.
+"""
+
+import json
+import os
+import stat
+import struct
+import tempfile
+from collections.abc import Iterable
+from datetime import UTC, datetime
+from enum import Enum
+from pathlib import Path
+from typing import IO
+
+from unidecode import unidecode
+
+from src.web_scrapping.models import ElectricityRates
+from src.web_scrapping.records import SECTIONS, RatesBatch
+
+BINARY_MAGIC = b"ATLR"
+BINARY_VERSION = 1
+
+
+class OutputFormat(str, Enum):
+    """Output formats supported by the command line interface."""
+
+    json = "json"
+    compact = "compact"
+    ndjson = "ndjson"
+    binary = "binary"
+
+
+def plan_slug(plan: str) -> str:
+    """
+    Return the slug of a plan name, as used in the names of its rates files.
+
+    Args:
+        plan (str): The plan name.
+
+    Returns:
+        str: The plan name transliterated to ASCII, with hyphens instead of spaces.
+    """
+    return unidecode(plan).replace(" ", "-")
+
+
+def _umask() -> int:
+    """Return the umask of the process."""
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+def atomic_write(path: Path, data: str | bytes) -> None:
+    """
+    Write data to a file atomically.
+
+    The data is written to a temporary file in the same directory, which is then
+    renamed over the destination, so readers never see a truncated file. The file
+    keeps the mode of the destination if it exists, or the default mode given by the
+    umask otherwise (as with `open`).
+
+    Args:
+        path (Path): The destination file.
+        data (str | bytes): The content to write (text is encoded as UTF-8).
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    try:
+        mode = stat.S_IMODE(path.stat().st_mode)
+    except FileNotFoundError:
+        mode = 0o666 & ~_umask()
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            os.fchmod(f.fileno(), mode)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def rates_record(
+    plan: str,
+    rates: ElectricityRates,
+    fetched_at: datetime | None = None,
+) -> dict:
+    """
+    Build the flat record used by the streaming outputs.
+
+    Args:
+        plan (str): The plan name.
+        rates (ElectricityRates): The electricity rates of the plan.
+        fetched_at (datetime, optional): When the rates were fetched.
+            Defaults to now.
+
+    Returns:
+        dict: The record, with the plan, fetch time and rates by section.
+    """
+    fetched_at = fetched_at or datetime.now(UTC)
+    return {
+        "plan": plan,
+        "fetched_at": fetched_at.isoformat(),
+        **rates.model_dump(mode="json"),
+    }
+
+
+def write_ndjson(records: Iterable[dict], stream: IO[str]) -> None:
+    """
+    Write records to a stream as NDJSON, flushing after each line.
+
+    Args:
+        records (Iterable[dict]): The records to write.
+        stream (IO[str]): The text stream to write to.
+    """
+    for record in records:
+        stream.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+        stream.write("\n")
+        stream.flush()
+
+
+def _pack_str(text: str) -> bytes:
+    """Encode a string as UTF-8 prefixed by its length."""
+    data = text.encode("utf-8")
+    return struct.pack("<H", len(data)) + data
+
+
+def _unpack_str(data: bytes, offset: int) -> tuple[str, int]:
+    """Decode a length-prefixed UTF-8 string, returning it and the next offset."""
+    (length,) = struct.unpack_from("<H", data, offset)
+    offset += 2
+    if offset + length > len(data):
+        raise ValueError("The compact binary rates data is truncated.")
+    return data[offset : offset + length].decode("utf-8"), offset + length
+
+
+def encode_binary(
+    plans: list[str],
+    fetched_at: list[datetime],
+    batch: RatesBatch,
+) -> bytes:
+    """
+    Encode observations in the compact binary format.
+
+    The layout is a header (magic, version, count), the unit of each section, the
+    plan names, the fetch timestamps as float64 and the raw rate values of the batch.
+
+    Args:
+        plans (list[str]): The plan name of each observation.
+        fetched_at (list[datetime]): The fetch time of each observation.
+        batch (RatesBatch): The rate values of each observation.
+
+    Raises:
+        ValueError: If the number of plans, timestamps and observations differ.
+
+    Returns:
+        bytes: The encoded observations.
+    """
+    if not len(plans) == len(fetched_at) == len(batch):
+        raise ValueError("Plans, timestamps and rates must have the same length.")
+    batch.validate()
+    parts = [BINARY_MAGIC, struct.pack("<BI", BINARY_VERSION, len(batch))]
+    parts.extend(_pack_str(batch.units[section]) for section in SECTIONS)
+    parts.extend(_pack_str(plan) for plan in plans)
+    parts.append(struct.pack(f"<{len(batch)}d", *(t.timestamp() for t in fetched_at)))
+    parts.append(batch.tobytes())
+    return b"".join(parts)
+
+
+def decode_binary(data: bytes) -> tuple[list[str], list[datetime], RatesBatch]:
+    """
+    Decode observations from the compact binary format.
+
+    Args:
+        data (bytes): The encoded observations, as returned by `encode_binary`.
+
+    Raises:
+        ValueError: If the data is not in the expected format.
+
+    Returns:
+        tuple[list[str], list[datetime], RatesBatch]: The plan names, fetch times
+            and rate values of the observations.
+    """
+    if data[:4] != BINARY_MAGIC:
+        raise ValueError("Data is not in the compact binary rates format.")
+    try:
+        version, count = struct.unpack_from("<BI", data, 4)
+        if version != BINARY_VERSION:
+            raise ValueError(f"Unsupported binary rates format version {version}.")
+        offset = 4 + struct.calcsize("<BI")
+        units = {}
+        for section in SECTIONS:
+            units[section], offset = _unpack_str(data, offset)
+        plans = []
+        for _ in range(count):
+            plan, offset = _unpack_str(data, offset)
+            plans.append(plan)
+        timestamps = struct.unpack_from(f"<{count}d", data, offset)
+    except struct.error as e:
+        raise ValueError("The compact binary rates data is truncated.") from e
+    offset += 8 * count
+    fetched_at = [datetime.fromtimestamp(t, UTC) for t in timestamps]
+    batch = RatesBatch.frombytes(data[offset:], units)
+    if len(batch) != count:
+        raise ValueError("Data is not in the compact binary rates format.")
+    return plans, fetched_at, batch.validate()
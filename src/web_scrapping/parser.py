@@ -4,124 +4,190 @@ Parser for current electricity rates from A tu Lado Energía.
 Provides tools to extract consumption and power prices from the company's website.
 """
 
+import contextlib
 import re
 import sys
+from datetime import UTC, datetime
+from pathlib import Path
 from typing import Literal
 
 import typer
 from bs4 import BeautifulSoup
-from pydantic import BaseModel, Field, field_validator
 from selenium import webdriver
-from selenium.common.exceptions import TimeoutException
+from selenium.common.exceptions import TimeoutException, WebDriverException
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
-from unidecode import unidecode
 from webdriver_manager.chrome import ChromeDriverManager
 
 from src.web_scrapping import paths
+from src.web_scrapping.diff import RatesDiffer, sink_from_spec
+from src.web_scrapping.memory import MemoryMonitor, MemoryStats, kill_process_tree
+from src.web_scrapping.models import ConsumptionRates, ElectricityRates, PowerRates
+from src.web_scrapping.output import (
+    OutputFormat,
+    atomic_write,
+    encode_binary,
+    plan_slug,
+    rates_record,
+    write_ndjson,
+)
+from src.web_scrapping.records import RatesBatch
 
 app = typer.Typer()
 
+# Base URL of the A tu Lado Energía website (the rates are under "/tarifas")
+BASE_URL = "https://clientes.atuladoenergia.com"
+
+
+# Chrome flags that reduce the memory used by the headless browser
+LOW_MEMORY_ARGUMENTS = [
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--no-first-run",
+    "--mute-audio",
+    "--renderer-process-limit=1",
+    "--disable-features=site-per-process,Translate,MediaRouter",
+    "--disk-cache-dir=/dev/null",
+    "--disk-cache-size=1",
+    "--media-cache-size=1",
+    "--aggressive-cache-discard",
+    "--blink-settings=imagesEnabled=false",
+    "--js-flags=--max-old-space-size=128",
+]
+
+
+def _chrome_options(low_memory: bool = False) -> Options:
+    """
+    Build the options of the headless Chrome browser.
 
-class ConsumptionRates(BaseModel):
-    """Model for consumption rates."""
-
-    peak: tuple[float, str] = Field(description="Peak rate (value, unit)")
-    flat: tuple[float, str] = Field(description="Flat rate (value, unit)")
-    valley: tuple[float, str] = Field(description="Valley rate (value, unit)")
-
-    @field_validator("peak", "flat", "valley")
-    @classmethod
-    def validate_period(cls, v: tuple[float, str]) -> tuple[float, str]:
-        """Validate that consumption rates use €/kWh and have positive values."""
-        value, unit = v
-        if value <= 0:
-            raise ValueError("Consumption rate values must be positive")
-        if unit != "€/kWh":
-            raise ValueError("Consumption rate units must be €/kWh")
-        return v
-
-
-class PowerRates(BaseModel):
-    """Model for power rates."""
-
-    peak: tuple[float, str] = Field(description="Peak rate (value, unit)")
-    flat: tuple[float, str] = Field(description="Flat rate (value, unit)")
-    valley: tuple[float, str] = Field(description="Valley rate (value, unit)")
-
-    @field_validator("peak", "flat", "valley")
-    @classmethod
-    def validate_period(cls, v: tuple[float, str]) -> tuple[float, str]:
-        """Validate that power rates use €/kW day and have positive values."""
-        value, unit = v
-        if value <= 0:
-            raise ValueError("Power rate values must be positive")
-        if unit != "€/kW day":
-            raise ValueError("Power rate units must be €/kW day")
-        return v
-
-
-class ElectricityRates(BaseModel):
-    """Model for electricity rates."""
+    Args:
+        low_memory (bool, optional): Whether to use the low-memory profile
+            (no extensions, a single renderer process, no disk cache and no images).
+            Defaults to False.
 
-    consumption: ConsumptionRates
-    power: PowerRates
+    Returns:
+        Options: The Chrome options.
+    """
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-gpu")
+    if low_memory:
+        for argument in LOW_MEMORY_ARGUMENTS:
+            chrome_options.add_argument(argument)
+        chrome_options.add_experimental_option(
+            "prefs", {"profile.managed_default_content_settings.images": 2}
+        )
+    return chrome_options
 
 
-def get_html() -> str:
+def get_html(
+    base_url: str = BASE_URL,
+    timeout: float = 15,
+    low_memory: bool = False,
+    memory_budget_mb: float | None = None,
+    max_recycles: int = 1,
+    memory_stats: MemoryStats | None = None,
+) -> str:
     """
     Load the online version of the A tu Lado Energía website.
 
+    The resident memory of the browser process tree is sampled while the page is
+    loading. If it exceeds the memory budget, the browser is killed and a new one is
+    started, up to `max_recycles` times.
+
+    Args:
+        base_url (str, optional): The base URL of the website, e.g. the URL of a
+            local replay server. Defaults to the A tu Lado Energía website.
+        timeout (float, optional): Seconds to wait for the rates to be rendered.
+            Defaults to 15.
+        low_memory (bool, optional): Whether to use the low-memory browser profile.
+            Defaults to False.
+        memory_budget_mb (float, optional): The memory budget of the browser in MB.
+            Defaults to no budget.
+        max_recycles (int, optional): How many times the browser can be restarted
+            after exceeding the memory budget. Defaults to 1.
+        memory_stats (MemoryStats, optional): Statistics to update with the memory
+            usage of the browser. Defaults to no statistics.
+
     Returns:
         str: The HTML content of the A tu Lado Energía website.
     """
-    URL = "https://clientes.atuladoenergia.com/tarifas"
+    URL = f"{base_url.rstrip('/')}/tarifas"
 
     # Setup Chrome options
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-gpu")
+    chrome_options = _chrome_options(low_memory)
+    budget_bytes = None if memory_budget_mb is None else int(memory_budget_mb * 2**20)
+    memory_stats = memory_stats if memory_stats is not None else MemoryStats()
 
     # Initialize WebDriver
     # This will automatically download and manage ChromeDriver
-    service = Service(ChromeDriverManager().install())
-    # Create a new Chrome browser instance, with the options we've set up
-    driver = webdriver.Chrome(service=service, options=chrome_options)
-
-    # Get the page
-    driver.get(URL)
-
-    try:
-        WebDriverWait(driver, 15).until(
-            EC.presence_of_element_located(
-                (
-                    By.XPATH,
-                    "//p[contains(translate(., 'milenial', 'MILENIAL'), 'MILENIAL')]",
+    driver_path = ChromeDriverManager().install()
+
+    for attempt in range(max_recycles + 1):
+        if attempt:
+            memory_stats.recycles += 1
+        # Create a new Chrome browser instance, with the options we've set up
+        driver = webdriver.Chrome(service=Service(driver_path), options=chrome_options)
+        driver_pid = driver.service.process.pid
+
+        try:
+            with MemoryMonitor(
+                driver_pid,
+                budget_bytes,
+                on_exceed=lambda pid=driver_pid: kill_process_tree(pid),
+                stats=memory_stats,
+            ) as monitor:
+                # Get the page
+                driver.get(URL)
+                WebDriverWait(driver, timeout).until(
+                    EC.presence_of_element_located(
+                        (
+                            By.XPATH,
+                            "//p[contains(translate(., 'milenial', 'MILENIAL'), 'MILENIAL')]",
+                        )
+                    )
                 )
-            )
-        )
-    except TimeoutException as e:
-        print(
-            "ERROR: Could not find any reference to the 'Milenial' plan "
-            "in the online version of the A tu Lado Energía website "
-            "after 15 seconds. The website may have changed "
-            "or there is a connection problem.",
-            file=sys.stderr,
-        )
-        driver.quit()
-        raise typer.Exit(1) from e
+                # Get the page source after JavaScript rendering
+                html = driver.page_source
+        except WebDriverException as e:
+            with contextlib.suppress(Exception):
+                driver.quit()
+            if monitor.exceeded:
+                print(
+                    f"WARNING: The browser exceeded the memory budget of "
+                    f"{memory_budget_mb} MB and was restarted.",
+                    file=sys.stderr,
+                )
+                continue
+            if isinstance(e, TimeoutException):
+                print(
+                    "ERROR: Could not find any reference to the 'Milenial' plan "
+                    "in the online version of the A tu Lado Energía website "
+                    f"after {timeout:g} seconds. The website may have changed "
+                    "or there is a connection problem.",
+                    file=sys.stderr,
+                )
+                raise typer.Exit(1) from e
+            raise
 
-    # Get the page source after JavaScript rendering
-    html = driver.page_source
+        # Close the browser (it's no longer needed, and frees up resources)
+        driver.quit()
 
-    # Close the browser (it's no longer needed, and frees up resources)
-    driver.quit()
+        return html
 
-    return html
+    print(
+        f"ERROR: The browser exceeded the memory budget of {memory_budget_mb} MB "
+        f"{max_recycles + 1} times.",
+        file=sys.stderr,
+    )
+    raise typer.Exit(1)
 
 
 def _extract_value_unit(text: str) -> tuple[float, str]:
@@ -258,28 +324,172 @@ def parse_rates(html: str, plan: str) -> ElectricityRates:
             )
 
 
+def _rates_path(plan: str) -> Path:
+    """
+    Return the path of the JSON file storing the rates of the given plan.
+
+    Args:
+        plan (str): The plan name.
+
+    Returns:
+        Path: The path of the rates file under the data directory.
+    """
+    return paths.data_dir / f"{plan_slug(plan)}_rates.json"
+
+
+def _seed_differ(differ: RatesDiffer | None, plan: str) -> None:
+    """
+    Seed the previous rates of a newly tracked plan from its rates file, if any.
+
+    Must be called before the rates file is overwritten with the new rates. A plan
+    without a rates file is seeded with no previous rates, so a failed emission of
+    its first rates is not hidden by the rates file written in the meantime.
+
+    Args:
+        differ (RatesDiffer | None): The differ, or None if changes are not tracked.
+        plan (str): The plan name.
+    """
+    if differ is None or plan in differ:
+        return
+    path = _rates_path(plan)
+    previous = (
+        ElectricityRates.model_validate_json(path.read_bytes())
+        if path.exists()
+        else None
+    )
+    differ.seed(plan, previous)
+
+
+def _diff_rates(
+    differ: RatesDiffer | None,
+    parsed_rates: list[tuple[str, ElectricityRates]],
+    fetched_at: datetime,
+) -> bool:
+    """
+    Emit the changes of the rates of each plan since the last run, if tracked.
+
+    Sink errors are reported on stderr without stopping the other plans. Their
+    changes are emitted again by the next run.
+
+    Args:
+        differ (RatesDiffer | None): The differ, or None if changes are not tracked.
+        parsed_rates (list[tuple[str, ElectricityRates]]): The plan names and their
+            new rates.
+        fetched_at (datetime): When the new rates were fetched.
+
+    Returns:
+        bool: Whether the changes of every plan were emitted.
+    """
+    if differ is None:
+        return True
+    emitted = True
+    for plan, rates in parsed_rates:
+        try:
+            differ.update(plan, rates, fetched_at)
+        except (ValueError, OSError) as e:
+            print(
+                f"ERROR: Could not emit the rate changes of the '{plan}' plan "
+                f"(they will be emitted again by the next run): {e}",
+                file=sys.stderr,
+            )
+            emitted = False
+    return emitted
+
+
 @app.command()
-def main(plan: str = "milenial") -> None:
+def main(
+    plan: list[str] = typer.Option(["milenial"]),
+    output: OutputFormat = OutputFormat.json,
+    base_url: str = typer.Option(BASE_URL, envvar="WEB_SCRAPPING_BASE_URL"),
+    timeout: float = 15,
+    low_memory: bool = False,
+    memory_budget: float | None = None,
+    changes: list[str] = typer.Option([]),
+) -> None:
     """
-    Parse the electricity rates for the given plan from the HTML.
+    Parse the electricity rates for the given plans from the HTML.
 
     Args:
-        plan (str, optional): The plan name to search for (case-insensitive).
-            Defaults to "milenial".
+        plan (list[str], optional): The plan names to search for (case-insensitive).
+            Can be repeated. Defaults to "milenial".
+        output (OutputFormat, optional): The output format. "json" and "compact"
+            write one (indented or compact) JSON file per plan under the data
+            directory, "ndjson" streams one record per plan to stdout and "binary"
+            writes all the plans to a single compact binary file. Defaults to "json".
+        base_url (str, optional): The base URL of the website, e.g. the URL of a
+            local replay server. Defaults to the A tu Lado Energía website.
+        timeout (float, optional): Seconds to wait for the rates to be rendered.
+            Defaults to 15.
+        low_memory (bool, optional): Whether to use the low-memory browser profile.
+            Defaults to False.
+        memory_budget (float, optional): The memory budget of the browser in MB.
+            The browser is restarted once if it exceeds it. Defaults to no budget.
+        changes (list[str], optional): Where to emit the rate changes since the last
+            run: "-" for stdout (stderr with the "ndjson" output, so the changes
+            do not mix with the records), an http(s) URL for a webhook or the path
+            of an NDJSON file. Can be repeated. The rates are written even if a
+            sink fails, but the command then exits with an error.
+            Defaults to not tracking changes.
     """
+    memory_stats = MemoryStats()
     try:
-        html = get_html()
-        parsed_rates = parse_rates(html, plan)
-
-        with open(
-            paths.data_dir / f"{unidecode(plan).replace(' ', '-')}_rates.json",
-            "w",
-            encoding="utf-8",
-        ) as f:
-            f.write(parsed_rates.model_dump_json(indent=4))
-    except (ValueError, PermissionError) as e:
+        html = get_html(
+            base_url=base_url,
+            timeout=timeout,
+            low_memory=low_memory,
+            memory_budget_mb=memory_budget,
+            memory_stats=memory_stats,
+        )
+        if memory_stats.samples:
+            print(
+                f"Peak browser memory: {memory_stats.peak_mb:.1f} MB "
+                f"({memory_stats.samples} samples, "
+                f"{memory_stats.recycles} restarts)",
+                file=sys.stderr,
+            )
+        fetched_at = datetime.now(UTC)
+
+        # Keep stdout for the records when they are streamed
+        stream = sys.stderr if output is OutputFormat.ndjson else None
+        differ = (
+            RatesDiffer(
+                paths.data_dir / ".rates_state.json",
+                [sink_from_spec(spec, stream) for spec in changes],
+            )
+            if changes
+            else None
+        )
+
+        parsed_rates = []
+        for p in plan:
+            rates = parse_rates(html, p)
+            if output is OutputFormat.ndjson:
+                write_ndjson([rates_record(p, rates, fetched_at)], sys.stdout)
+            parsed_rates.append((p, rates))
+            # Before the rates file is overwritten, as it may seed the differ
+            _seed_differ(differ, p)
+
+        # Write the rates before emitting the changes, so a failing sink does not
+        # lose them
+        if output is OutputFormat.binary:
+            atomic_write(
+                paths.data_dir / "rates.bin",
+                encode_binary(
+                    plan,
+                    [fetched_at] * len(plan),
+                    RatesBatch.from_rates(rates for _, rates in parsed_rates),
+                ),
+            )
+        elif output is not OutputFormat.ndjson:
+            indent = 4 if output is OutputFormat.json else None
+            for p, rates in parsed_rates:
+                atomic_write(_rates_path(p), rates.model_dump_json(indent=indent))
+        emitted = _diff_rates(differ, parsed_rates, fetched_at)
+    except (ValueError, OSError) as e:
         print(str(e), file=sys.stderr)
         raise typer.Exit(1) from e
+    if not emitted:
+        raise typer.Exit(1)
 
 
 if __name__ == "__main__":
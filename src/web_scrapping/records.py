@@ -0,0 +1,280 @@
+"""
+Compact records for bulk electricity rates data.
+
+Provides slotted and array-backed alternatives to the `ElectricityRates` model for
+workloads that handle many observations at once (batch parsing, bill calculations).
+"""
+
+import sys
+from array import array
+from collections.abc import Iterable, Iterator
+
+from src.web_scrapping.models import (
+    CONSUMPTION_UNIT,
+    POWER_UNIT,
+    ConsumptionRates,
+    ElectricityRates,
+    PowerRates,
+)
+
+SECTIONS = ("consumption", "power")
+PERIODS = ("peak", "flat", "valley")
+FIELDS = tuple(f"{section}_{period}" for section in SECTIONS for period in PERIODS)
+UNITS = {"consumption": CONSUMPTION_UNIT, "power": POWER_UNIT}
+SECTION_MODELS = {"consumption": ConsumptionRates, "power": PowerRates}
+
+
+class RatesRecord:
+    """Slotted record holding the six rate values of a plan, without units."""
+
+    __slots__ = FIELDS
+
+    def __init__(
+        self,
+        consumption_peak: float,
+        consumption_flat: float,
+        consumption_valley: float,
+        power_peak: float,
+        power_flat: float,
+        power_valley: float,
+    ) -> None:
+        """
+        Create a record from the rate values of each section and period.
+
+        Args:
+            consumption_peak (float): Peak consumption rate (€/kWh).
+            consumption_flat (float): Flat consumption rate (€/kWh).
+            consumption_valley (float): Valley consumption rate (€/kWh).
+            power_peak (float): Peak power rate (€/kW day).
+            power_flat (float): Flat power rate (€/kW day).
+            power_valley (float): Valley power rate (€/kW day).
+        """
+        self.consumption_peak = consumption_peak
+        self.consumption_flat = consumption_flat
+        self.consumption_valley = consumption_valley
+        self.power_peak = power_peak
+        self.power_flat = power_flat
+        self.power_valley = power_valley
+
+    @classmethod
+    def from_rates(cls, rates: ElectricityRates) -> "RatesRecord":
+        """
+        Create a record from validated electricity rates.
+
+        Args:
+            rates (ElectricityRates): The electricity rates to convert.
+
+        Returns:
+            RatesRecord: The record holding the rate values.
+        """
+        consumption, power = rates.consumption, rates.power
+        return cls(
+            consumption.peak[0],
+            consumption.flat[0],
+            consumption.valley[0],
+            power.peak[0],
+            power.flat[0],
+            power.valley[0],
+        )
+
+    def to_rates(self) -> ElectricityRates:
+        """
+        Convert the record back to electricity rates.
+
+        The models are built without running their validators again, so the record
+        is expected to come from validated data (see `RatesBatch.validate`).
+
+        Returns:
+            ElectricityRates: The electricity rates, with the canonical units.
+        """
+        consumption_unit, power_unit = UNITS["consumption"], UNITS["power"]
+        return ElectricityRates.model_construct(
+            consumption=ConsumptionRates.model_construct(
+                peak=(self.consumption_peak, consumption_unit),
+                flat=(self.consumption_flat, consumption_unit),
+                valley=(self.consumption_valley, consumption_unit),
+            ),
+            power=PowerRates.model_construct(
+                peak=(self.power_peak, power_unit),
+                flat=(self.power_flat, power_unit),
+                valley=(self.power_valley, power_unit),
+            ),
+        )
+
+    def values(self) -> tuple[float, ...]:
+        """
+        Return the rate values in `FIELDS` order.
+
+        Returns:
+            tuple[float, ...]: The six rate values.
+        """
+        return tuple(getattr(self, field) for field in FIELDS)
+
+    def __eq__(self, other: object) -> bool:
+        """Compare two records by their rate values."""
+        if not isinstance(other, RatesRecord):
+            return NotImplemented
+        return self.values() == other.values()
+
+    def __hash__(self) -> int:
+        """Hash the record by its rate values."""
+        return hash(self.values())
+
+    def __repr__(self) -> str:
+        """Return a readable representation of the record."""
+        fields = ", ".join(f"{field}={getattr(self, field)!r}" for field in FIELDS)
+        return f"{type(self).__name__}({fields})"
+
+
+class RatesBatch:
+    """
+    Array-backed collection of rate observations.
+
+    Values are stored in a single flat `array("d")`, six per observation in `FIELDS`
+    order, and units are stored once per section.
+    """
+
+    __slots__ = ("_values", "units")
+
+    def __init__(
+        self,
+        values: Iterable[float] = (),
+        units: dict[str, str] | None = None,
+    ) -> None:
+        """
+        Create a batch from a flat sequence of rate values.
+
+        Args:
+            values (Iterable[float], optional): Rate values, six per observation in
+                `FIELDS` order. Defaults to an empty batch.
+            units (dict[str, str], optional): Unit of each section. Defaults to the
+                canonical units.
+
+        Raises:
+            ValueError: If the number of values is not a multiple of six.
+        """
+        self._values = array("d", values)
+        if len(self._values) % len(FIELDS):
+            raise ValueError(
+                f"The number of values must be a multiple of {len(FIELDS)}."
+            )
+        self.units = dict(UNITS if units is None else units)
+
+    @classmethod
+    def from_rates(cls, rates: Iterable[ElectricityRates]) -> "RatesBatch":
+        """
+        Create a batch from validated electricity rates.
+
+        Args:
+            rates (Iterable[ElectricityRates]): The electricity rates to store.
+
+        Returns:
+            RatesBatch: The batch holding all the observations.
+        """
+        batch = cls()
+        for item in rates:
+            batch.append(item)
+        return batch
+
+    def append(self, rates: ElectricityRates | RatesRecord) -> None:
+        """
+        Append an observation to the batch.
+
+        Args:
+            rates (ElectricityRates | RatesRecord): The observation to append.
+        """
+        if isinstance(rates, ElectricityRates):
+            rates = RatesRecord.from_rates(rates)
+        self._values.extend(rates.values())
+
+    def validate(self) -> "RatesBatch":
+        """
+        Validate all the observations of the batch at once.
+
+        Runs the period validator of `ConsumptionRates` and `PowerRates` on each
+        distinct value of a column, with the unit of its section, so the rules and
+        their errors come from the models. Rates rarely change between
+        observations, so a column holds few distinct values.
+
+        Raises:
+            ValueError: If a unit is not the expected one or a value is not positive.
+
+        Returns:
+            RatesBatch: The batch itself, to allow chaining.
+        """
+        width = len(FIELDS)
+        for offset, field in enumerate(FIELDS):
+            section = field.split("_", 1)[0]
+            validate_period = SECTION_MODELS[section].validate_period
+            unit = self.units.get(section)
+            for value in set(self._values[offset::width]):
+                validate_period((value, unit))
+        return self
+
+    def to_rates(self) -> list[ElectricityRates]:
+        """
+        Convert all the observations back to electricity rates.
+
+        Returns:
+            list[ElectricityRates]: The electricity rates, in insertion order.
+        """
+        self.validate()
+        return [record.to_rates() for record in self]
+
+    def tobytes(self) -> bytes:
+        """
+        Return the rate values as little-endian float64 bytes.
+
+        Returns:
+            bytes: The raw rate values, six per observation in `FIELDS` order.
+        """
+        if sys.byteorder == "little":
+            return self._values.tobytes()
+        values = array("d", self._values)
+        values.byteswap()
+        return values.tobytes()
+
+    @classmethod
+    def frombytes(
+        cls, data: bytes, units: dict[str, str] | None = None
+    ) -> "RatesBatch":
+        """
+        Create a batch from little-endian float64 bytes.
+
+        Args:
+            data (bytes): The raw rate values, as returned by `tobytes`.
+            units (dict[str, str], optional): Unit of each section. Defaults to the
+                canonical units.
+
+        Returns:
+            RatesBatch: The batch holding the observations.
+        """
+        values = array("d")
+        values.frombytes(data)
+        if sys.byteorder != "little":
+            values.byteswap()
+        return cls(values, units)
+
+    @property
+    def nbytes(self) -> int:
+        """Size in bytes of the buffer holding the rate values."""
+        return self._values.itemsize * len(self._values)
+
+    def __len__(self) -> int:
+        """Return the number of observations in the batch."""
+        return len(self._values) // len(FIELDS)
+
+    def __getitem__(self, index: int) -> RatesRecord:
+        """Return the observation at the given index as a record."""
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("RatesBatch index out of range")
+        start = index * len(FIELDS)
+        return RatesRecord(*self._values[start : start + len(FIELDS)])
+
+    def __iter__(self) -> Iterator[RatesRecord]:
+        """Iterate over the observations of the batch as records."""
+        values, width = self._values, len(FIELDS)
+        for start in range(0, len(values), width):
+            yield RatesRecord(*values[start : start + width])
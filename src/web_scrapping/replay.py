@@ -0,0 +1,255 @@
+"""
+Local replay server for saved A tu Lado Energía web pages.
+
+Serves archived snapshots on localhost with configurable latency, bandwidth,
+JavaScript rendering delay and injected failures, so the online path (`get_html`)
+can be tested and benchmarked without the real website.
+"""
+
+import contextlib
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from types import TracebackType
+
+import typer
+from bs4 import BeautifulSoup
+from pydantic import BaseModel, Field
+
+from src.web_scrapping import paths
+
+app = typer.Typer()
+
+
+class ReplayConfig(BaseModel):
+    """Model for the behaviour of the replay server."""
+
+    latency: float = Field(0.0, ge=0, description="Seconds before each response")
+    bandwidth: int | None = Field(
+        None, gt=0, description="Maximum bytes per second of each response"
+    )
+    render_delay: float = Field(
+        0.0, ge=0, description="Seconds before JavaScript renders the page body"
+    )
+    failure_rate: float = Field(
+        0.0, ge=0, le=1, description="Probability of answering with an error"
+    )
+    failure_status: int = Field(503, description="HTTP status of injected failures")
+    seed: int = Field(0, description="Seed of the failure injection")
+
+
+def delay_rendering(html: str, delay: float) -> str:
+    """
+    Move the body of a page into a script that renders it after a delay.
+
+    This mimics a page whose content is rendered by JavaScript, so clients have to
+    wait for it (as `get_html` does with the real website).
+
+    Args:
+        html (str): The HTML content.
+        delay (float): Seconds before the body is rendered.
+
+    Returns:
+        str: The HTML content with an empty body and the rendering script.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    body = soup.body
+    if body is None:
+        return html
+    content = json.dumps(body.decode_contents()).replace("</", "<\\/")
+    body.clear()
+    script = soup.new_tag("script")
+    script.string = (
+        f"setTimeout(function () {{ document.body.innerHTML = {content}; }}, "
+        f"{int(delay * 1000)});"
+    )
+    body.append(script)
+    return str(soup)
+
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    """Request handler serving the snapshots of a `ReplayServer`."""
+
+    server: "_ReplayHTTPServer"
+
+    def do_GET(self) -> None:
+        """Serve a snapshot, applying the configured latency and failures."""
+        config = self.server.config
+        if config.latency:
+            time.sleep(config.latency)
+
+        if self.server.should_fail():
+            self.send_error(config.failure_status, "Injected failure")
+            return
+
+        page = self.server.pages.get(self.path.split("?", 1)[0])
+        if page is None:
+            self.send_error(404, "Snapshot not found")
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(page)))
+        self.end_headers()
+        if config.bandwidth is None:
+            self.wfile.write(page)
+            return
+        # Send the page in chunks of a tenth of a second each
+        chunk_size = max(1, config.bandwidth // 10)
+        for start in range(0, len(page), chunk_size):
+            chunk = page[start : start + chunk_size]
+            self.wfile.write(chunk)
+            self.wfile.flush()
+            time.sleep(len(chunk) / config.bandwidth)
+
+    def log_message(self, format: str, *args: object) -> None:
+        """Silence the default request logging."""
+
+
+class _ReplayHTTPServer(ThreadingHTTPServer):
+    """HTTP server holding the rendered snapshots and the failure generator."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        pages: dict[str, bytes],
+        config: ReplayConfig,
+    ) -> None:
+        """Create the server, listening on the given address."""
+        super().__init__(address, _ReplayHandler)
+        self.pages = pages
+        self.config = config
+        self._random = random.Random(config.seed)  # noqa: S311
+        self._lock = threading.Lock()
+
+    def should_fail(self) -> bool:
+        """Draw whether the next response is an injected failure."""
+        with self._lock:
+            return self._random.random() < self.config.failure_rate
+
+
+class ReplayServer:
+    """
+    Serve saved web pages on localhost in a background thread.
+
+    Use it as a context manager, and point `get_html` at `url`.
+    """
+
+    def __init__(
+        self,
+        routes: dict[str, Path] | None = None,
+        config: ReplayConfig | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        """
+        Create a replay server.
+
+        Args:
+            routes (dict[str, Path], optional): The snapshot served at each path.
+                Defaults to the offline copy of the website at "/tarifas".
+            config (ReplayConfig, optional): The behaviour of the server.
+                Defaults to no latency, throttling, rendering delay or failures.
+            host (str, optional): The address to listen on. Defaults to "127.0.0.1".
+            port (int, optional): The port to listen on. Defaults to a free port.
+        """
+        routes = routes or {"/tarifas": paths.static_html}
+        self.config = config or ReplayConfig()
+        pages = {}
+        for route, path in routes.items():
+            html = path.read_text(encoding="utf-8")
+            if self.config.render_delay:
+                html = delay_rendering(html, self.config.render_delay)
+            pages[route] = html.encode("utf-8")
+        self._server = _ReplayHTTPServer((host, port), pages, self.config)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        """Base URL of the server."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> None:
+        """Start serving in the background."""
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop serving and release the socket."""
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self) -> "ReplayServer":
+        """Start serving in the background."""
+        self.start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Stop serving."""
+        self.stop()
+
+
+@app.command()
+def main(
+    snapshot: Path = paths.static_html,
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    latency: float = 0.0,
+    bandwidth: int | None = None,
+    render_delay: float = 0.0,
+    failure_rate: float = 0.0,
+    failure_status: int = 503,
+    seed: int = 0,
+) -> None:
+    """
+    Serve a saved web page at "/tarifas" until interrupted.
+
+    Args:
+        snapshot (Path, optional): The saved web page.
+            Defaults to the offline copy of the website.
+        host (str, optional): The address to listen on. Defaults to "127.0.0.1".
+        port (int, optional): The port to listen on. Defaults to 8000.
+        latency (float, optional): Seconds before each response. Defaults to 0.
+        bandwidth (int, optional): Maximum bytes per second of each response.
+            Defaults to no limit.
+        render_delay (float, optional): Seconds before JavaScript renders the page.
+            Defaults to 0.
+        failure_rate (float, optional): Probability of answering with an error.
+            Defaults to 0.
+        failure_status (int, optional): HTTP status of injected failures.
+            Defaults to 503.
+        seed (int, optional): Seed of the failure injection. Defaults to 0.
+    """
+    try:
+        config = ReplayConfig(
+            latency=latency,
+            bandwidth=bandwidth,
+            render_delay=render_delay,
+            failure_rate=failure_rate,
+            failure_status=failure_status,
+            seed=seed,
+        )
+        server = ReplayServer({"/tarifas": snapshot}, config, host, port)
+    except (ValueError, OSError) as e:
+        print(str(e), file=sys.stderr)
+        raise typer.Exit(1) from e
+
+    print(f"Serving {snapshot} at {server.url}/tarifas", file=sys.stderr)
+    with server, contextlib.suppress(KeyboardInterrupt):
+        threading.Event().wait()
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,337 @@
+"""
+Incremental parsing of a directory of saved A tu Lado Energía web pages.
+
+Tracks the snapshots that have already been parsed in a persistent manifest, so only
+new or changed snapshots are parsed and appended to the output store.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import UTC, datetime
+from pathlib import Path
+
+import typer
+from pydantic import BaseModel, PrivateAttr
+
+from src.web_scrapping import paths
+from src.web_scrapping.output import atomic_write, rates_record, write_ndjson
+from src.web_scrapping.parser import parse_rates
+
+app = typer.Typer()
+
+
+class ManifestEntry(BaseModel):
+    """Model for the state of a snapshot when it was last parsed."""
+
+    size: int
+    mtime_ns: int
+    sha256: str
+
+
+class Manifest(BaseModel):
+    """
+    Model for the snapshots already parsed into an output store.
+
+    The manifest is stored as an append-only NDJSON log, with one line per committed
+    snapshot holding its state and the size of the store after the commit. Later
+    lines override earlier ones, and the log is compacted once it holds more
+    superseded lines than live ones.
+    """
+
+    store_size: int = 0
+    files: dict[str, ManifestEntry] = {}
+    _lines: int = PrivateAttr(0)
+    _partial_at: int | None = PrivateAttr(None)
+
+    @classmethod
+    def load(cls, path: Path) -> "Manifest":
+        """
+        Load a manifest from a file, or create an empty one if it does not exist.
+
+        A trailing partial line (from a run killed while writing it) is ignored.
+
+        Args:
+            path (Path): The manifest file.
+
+        Returns:
+            Manifest: The loaded manifest.
+        """
+        manifest = cls()
+        if not path.exists():
+            return manifest
+        with open(path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Dropped by the next append, so it is not extended
+                    manifest._partial_at = f.tell() - len(line)
+                    break
+                data = json.loads(line)
+                manifest.store_size = data.pop("store_size")
+                manifest.files[data.pop("snapshot")] = ManifestEntry(**data)
+                manifest._lines += 1
+        return manifest
+
+    def _line(self, snapshot: str, entry: ManifestEntry) -> str:
+        """Return the log line recording the state of a snapshot."""
+        record = {"snapshot": snapshot, **entry.model_dump()}
+        record["store_size"] = self.store_size
+        return json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+    def append(self, path: Path, entries: list[tuple[str, ManifestEntry]]) -> None:
+        """
+        Record snapshots in the manifest and append them to its file.
+
+        The new lines hold the current `store_size`, so they commit it too. A
+        trailing partial line found on load is dropped first, so new lines are not
+        appended to it.
+
+        Args:
+            path (Path): The manifest file.
+            entries (list[tuple[str, ManifestEntry]]): The identity and state of the
+                snapshots.
+        """
+        self.files.update(entries)
+        if self._partial_at is not None:
+            os.truncate(path, self._partial_at)
+            self._partial_at = None
+        with open(path, "a", encoding="utf-8") as f:
+            f.writelines(self._line(snapshot, entry) for snapshot, entry in entries)
+            f.flush()
+            os.fsync(f.fileno())
+        self._lines += len(entries)
+
+    def needs_compaction(self) -> bool:
+        """Return whether the log holds more superseded lines than live ones."""
+        return self._lines > 2 * len(self.files)
+
+    def save(self, path: Path) -> None:
+        """
+        Save the manifest to a file atomically, with one line per snapshot.
+
+        Args:
+            path (Path): The manifest file.
+        """
+        atomic_write(
+            path,
+            "".join(
+                self._line(snapshot, entry) for snapshot, entry in self.files.items()
+            ),
+        )
+        self._lines = len(self.files)
+        self._partial_at = None
+
+
+def _sha256(path: Path) -> str:
+    """Return the SHA-256 hex digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_snapshot(path: Path, snapshot: str, plans: list[str]) -> list[dict]:
+    """
+    Parse the rates of the given plans from a saved web page.
+
+    Plans that cannot be parsed are reported on stderr and skipped, as are
+    snapshots that cannot be read (e.g. not UTF-8, or removed in the meantime), so a
+    bad snapshot does not block the others.
+
+    Args:
+        path (Path): The saved web page.
+        snapshot (str): The identity of the snapshot, stored in each record.
+        plans (list[str]): The plan names to search for (case-insensitive).
+
+    Returns:
+        list[dict]: One record per parsed plan, timestamped with the modification
+            time of the snapshot.
+    """
+    try:
+        html = path.read_text(encoding="utf-8")
+        fetched_at = datetime.fromtimestamp(path.stat().st_mtime, UTC)
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"{snapshot}: {e}", file=sys.stderr)
+        return []
+    records = []
+    for plan in plans:
+        try:
+            rates = parse_rates(html, plan)
+        except ValueError as e:
+            print(f"{snapshot}: {e}", file=sys.stderr)
+            continue
+        records.append({"snapshot": snapshot, **rates_record(plan, rates, fetched_at)})
+    return records
+
+
+def _changed_snapshots(
+    directory: Path,
+    pattern: str,
+    manifest: Manifest,
+) -> tuple[list[tuple[str, ManifestEntry]], list[tuple[str, ManifestEntry]]]:
+    """
+    Find the snapshots that are new or have changed since they were last parsed.
+
+    Snapshots whose size and modification time match the manifest are skipped
+    without being read, and only the remaining ones are hashed.
+
+    Args:
+        directory (Path): The directory holding the snapshots.
+        pattern (str): The glob pattern of the snapshot files.
+        manifest (Manifest): The manifest of the parsed snapshots.
+
+    Returns:
+        tuple[list[tuple[str, ManifestEntry]], list[tuple[str, ManifestEntry]]]:
+            The snapshots whose content changed and the snapshots that were only
+            touched, with their identity and current state.
+    """
+    changed, touched = [], []
+    for path in sorted(directory.glob(pattern)):
+        if not path.is_file() or path.name.startswith("."):
+            continue
+        snapshot = path.relative_to(directory).as_posix()
+        try:
+            stat = path.stat()
+            entry = manifest.files.get(snapshot)
+            if (
+                entry
+                and entry.size == stat.st_size
+                and entry.mtime_ns == stat.st_mtime_ns
+            ):
+                continue
+            current = ManifestEntry(
+                size=stat.st_size, mtime_ns=stat.st_mtime_ns, sha256=_sha256(path)
+            )
+        except FileNotFoundError:
+            # Removed since it was listed
+            continue
+        if entry and entry.sha256 == current.sha256:
+            touched.append((snapshot, current))
+        else:
+            changed.append((snapshot, current))
+    return changed, touched
+
+
+def scan(
+    directory: Path,
+    store: Path,
+    manifest_path: Path,
+    plans: list[str],
+    pattern: str = "*.html",
+    workers: int | None = None,
+    chunk_size: int = 64,
+) -> int:
+    """
+    Parse the new or changed snapshots of a directory into an output store.
+
+    Snapshots are parsed in parallel and committed in chunks: records are appended
+    to the NDJSON store and then the snapshots are appended to the manifest with the
+    new size of the store. Snapshots that cannot be read are reported and committed
+    without records, so they are skipped until they change. Anything appended to
+    the store after the last commit (e.g. by a run that was killed) is truncated on
+    the next scan, so no snapshot is stored twice. The store is expected to be
+    written by this function only.
+
+    Args:
+        directory (Path): The directory holding the snapshots.
+        store (Path): The NDJSON file the records are appended to.
+        manifest_path (Path): The manifest file.
+        plans (list[str]): The plan names to search for (case-insensitive).
+        pattern (str, optional): The glob pattern of the snapshot files.
+            Defaults to "*.html".
+        workers (int, optional): The number of worker processes.
+            Defaults to the number of CPUs.
+        chunk_size (int, optional): The number of snapshots per commit.
+            Defaults to 64.
+
+    Returns:
+        int: The number of snapshots parsed.
+    """
+    manifest = Manifest.load(manifest_path)
+    store_size = store.stat().st_size if store.exists() else 0
+    if not manifest.files:
+        manifest.store_size = store_size
+    elif store_size > manifest.store_size:
+        os.truncate(store, manifest.store_size)
+    if manifest.needs_compaction():
+        manifest.save(manifest_path)
+
+    changed, touched = _changed_snapshots(directory, pattern, manifest)
+    if touched:
+        manifest.append(manifest_path, touched)
+    if not changed:
+        return 0
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for start in range(0, len(changed), chunk_size):
+            chunk = changed[start : start + chunk_size]
+            results = executor.map(
+                parse_snapshot,
+                [directory / snapshot for snapshot, _ in chunk],
+                [snapshot for snapshot, _ in chunk],
+                [plans] * len(chunk),
+            )
+            with open(store, "a", encoding="utf-8") as f:
+                for records in results:
+                    write_ndjson(records, f)
+                os.fsync(f.fileno())
+            manifest.store_size = store.stat().st_size
+            manifest.append(manifest_path, chunk)
+    return len(changed)
+
+
+@app.callback()
+def callback() -> None:
+    """Parse saved A tu Lado Energía web pages as they are dropped in a directory."""
+
+
+@app.command("watch-dir")
+def watch_dir(
+    directory: Path = typer.Argument(paths.web_dir),
+    plan: list[str] = typer.Option(["milenial"]),
+    store: Path = paths.data_dir / "rates.ndjson",
+    manifest: Path | None = None,
+    pattern: str = "*.html",
+    workers: int | None = None,
+    interval: float = 60.0,
+    once: bool = False,
+) -> None:
+    """
+    Watch a directory and parse new or changed snapshots into an NDJSON store.
+
+    Args:
+        directory (Path, optional): The directory holding the snapshots.
+            Defaults to the web data directory.
+        plan (list[str], optional): The plan names to search for (case-insensitive).
+            Can be repeated. Defaults to "milenial".
+        store (Path, optional): The NDJSON file the records are appended to.
+            Defaults to "rates.ndjson" in the data directory.
+        manifest (Path, optional): The manifest file.
+            Defaults to ".watch-manifest.ndjson" in the watched directory.
+        pattern (str, optional): The glob pattern of the snapshot files.
+            Defaults to "*.html".
+        workers (int, optional): The number of worker processes.
+            Defaults to the number of CPUs.
+        interval (float, optional): Seconds between scans. Defaults to 60.
+        once (bool, optional): Scan the directory once and exit. Defaults to False.
+    """
+    manifest = manifest or directory / ".watch-manifest.ndjson"
+    try:
+        while True:
+            parsed = scan(directory, store, manifest, plan, pattern, workers)
+            if parsed:
+                print(f"Parsed {parsed} snapshot(s) from {directory}", file=sys.stderr)
+            if once:
+                break
+            time.sleep(interval)
+    except (ValueError, OSError) as e:
+        print(str(e), file=sys.stderr)
+        raise typer.Exit(1) from e
+
+
+if __name__ == "__main__":
+    app()
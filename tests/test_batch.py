@@ -0,0 +1,159 @@
+"""Tests for the sharded batch parsing in the batch module."""
+
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from src.web_scrapping import batch, paths
+
+
+@pytest.fixture
+def snapshots(tmp_path: Path) -> Path:
+    """Create a snapshot directory holding several copies of the offline website."""
+    directory = tmp_path / "web"
+    directory.mkdir()
+    for month in range(1, 9):
+        shutil.copy(paths.static_html, directory / f"2025-{month:02d}.html")
+    return directory
+
+
+def _read_ndjson(path: Path) -> list[dict]:
+    """Read the records of an NDJSON file."""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_parse_shard_spec():
+    """Test the parsing of shard specifications."""
+    assert batch.parse_shard_spec("2/8") == (2, 8)
+    assert batch.parse_shard_spec(" 0 / 1 ") == (0, 1)
+    for spec in ("8/8", "1", "a/b", "-1/2"):
+        with pytest.raises(ValueError):
+            batch.parse_shard_spec(spec)
+
+
+def test_shard_of_is_stable():
+    """Test that snapshots are assigned to shards by a stable hash."""
+    assert batch.shard_of("2025-01.html", 4) == batch.shard_of("2025-01.html", 4)
+    shards = {batch.shard_of(f"{i}.html", 4) for i in range(100)}
+    assert shards == {0, 1, 2, 3}
+
+
+def test_shards_cover_all_snapshots(snapshots: Path, tmp_path: Path):
+    """Test that every snapshot is parsed by exactly one shard and merged."""
+    output_dir = tmp_path / "shards"
+    parsed = [
+        batch.parse_shard(snapshots, output_dir, i, 3, ["milenial"], workers=1)
+        for i in range(3)
+    ]
+    assert sum(parsed) == 8
+
+    destination = tmp_path / "rates.ndjson"
+    assert batch.merge_shards(output_dir, destination) == 8
+    records = _read_ndjson(destination)
+    assert [r["snapshot"] for r in records] == [
+        f"2025-{month:02d}.html" for month in range(1, 9)
+    ]
+
+
+def test_parse_shard_resumes(snapshots: Path, tmp_path: Path):
+    """Test that a killed shard resumes without parsing snapshots twice."""
+    output_dir = tmp_path / "shards"
+    assert batch.parse_shard(snapshots, output_dir, 0, 1, ["milenial"], workers=1) == 8
+    directory = batch.shard_dir(output_dir, 0, 1)
+    committed = (directory / batch.RECORDS_FILE).read_bytes()
+
+    # Simulate a worker killed while writing a new snapshot
+    shutil.copy(paths.static_html, snapshots / "2025-09.html")
+    with open(directory / batch.RECORDS_FILE, "a", encoding="utf-8") as f:
+        f.write('{"snapshot": "2025-09.html", "pl')
+    with open(directory / batch.CHECKPOINT_FILE, "a", encoding="utf-8") as f:
+        f.write("2025-09.ht")
+
+    assert batch.parse_shard(snapshots, output_dir, 0, 1, ["milenial"], workers=1) == 1
+    assert batch.parse_shard(snapshots, output_dir, 0, 1, ["milenial"], workers=1) == 0
+    assert (directory / batch.RECORDS_FILE).read_bytes().startswith(committed)
+    records = batch.read_committed_records(directory)
+    assert len(records) == 9
+    assert records[-1]["snapshot"] == "2025-09.html"
+
+
+def test_parse_shard_skips_unreadable_snapshots(snapshots: Path, tmp_path: Path):
+    """Test that a snapshot that is not UTF-8 is checkpointed without records."""
+    output_dir = tmp_path / "shards"
+    (snapshots / "2025-00.html").write_bytes(b"\xff\xfe")
+    assert batch.parse_shard(snapshots, output_dir, 0, 1, ["milenial"], workers=1) == 9
+    assert batch.parse_shard(snapshots, output_dir, 0, 1, ["milenial"], workers=1) == 0
+    directory = batch.shard_dir(output_dir, 0, 1)
+    assert "2025-00.html" in batch.read_checkpoint(directory)[0]
+    assert len(batch.read_committed_records(directory)) == 8
+
+
+def test_merge_is_deterministic(snapshots: Path, tmp_path: Path):
+    """Test that the merged output does not depend on the number of shards."""
+    outputs = []
+    for count in (1, 4):
+        output_dir = tmp_path / f"shards-{count}"
+        for i in range(count):
+            batch.parse_shard(snapshots, output_dir, i, count, ["milenial"], workers=1)
+        destination = tmp_path / f"rates-{count}.ndjson"
+        batch.merge_shards(output_dir, destination)
+        outputs.append(destination.read_bytes())
+    assert outputs[0] == outputs[1]
+
+
+def test_merge_missing_shard(snapshots: Path, tmp_path: Path):
+    """Test that merging an incomplete set of shards raises a ValueError."""
+    output_dir = tmp_path / "shards"
+    batch.parse_shard(snapshots, output_dir, 0, 2, ["milenial"], workers=1)
+    batch.shard_dir(output_dir, 0, 2).mkdir(exist_ok=True)
+    with pytest.raises(ValueError) as excinfo:
+        batch.merge_shards(output_dir, tmp_path / "rates.ndjson")
+    assert "Missing shards 1/2" in str(excinfo.value)
+
+
+def test_merge_incomplete_shard(snapshots: Path, tmp_path: Path):
+    """Test that a shard without its completion marker is only merged on request."""
+    output_dir = tmp_path / "shards"
+    batch.parse_shard(snapshots, output_dir, 0, 2, ["milenial"], workers=1)
+    batch.parse_shard(snapshots, output_dir, 1, 2, ["milenial"], workers=1)
+    # Simulate a shard killed (or still running) after its first commits
+    (batch.shard_dir(output_dir, 1, 2) / batch.DONE_FILE).unlink()
+
+    destination = tmp_path / "rates.ndjson"
+    with pytest.raises(ValueError) as excinfo:
+        batch.merge_shards(output_dir, destination)
+    assert "Incomplete shards 1/2" in str(excinfo.value)
+    assert not destination.exists()
+
+    assert batch.merge_shards(output_dir, destination, allow_partial=True) == 8
+    batch.parse_shard(snapshots, output_dir, 1, 2, ["milenial"], workers=1)
+    assert batch.merge_shards(output_dir, destination) == 8
+
+
+def test_batch_cli(snapshots: Path, tmp_path: Path):
+    """Test the parse and merge commands."""
+    runner = CliRunner()
+    output_dir = tmp_path / "shards"
+    for shard in ("0/2", "1/2"):
+        result = runner.invoke(
+            batch.app,
+            [
+                "parse",
+                str(snapshots),
+                "--shard",
+                shard,
+                "--output-dir",
+                str(output_dir),
+            ],
+        )
+        assert result.exit_code == 0
+    result = runner.invoke(batch.app, ["merge", str(output_dir)])
+    assert result.exit_code == 0
+    assert len(_read_ndjson(output_dir / batch.MERGED_FILE)) == 8
+
+    result = runner.invoke(batch.app, ["parse", str(snapshots), "--shard", "2/2"])
+    assert result.exit_code == 1
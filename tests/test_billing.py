@@ -0,0 +1,127 @@
+"""Tests for the bill calculations in the billing module."""
+
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+from src.web_scrapping.billing import (
+    AggregateStore,
+    ProfileAggregates,
+    aggregate_profile,
+    consumption_period,
+)
+from src.web_scrapping.models import ConsumptionRates, ElectricityRates, PowerRates
+
+# Billing period of the readings fixture
+START, END = date(2025, 6, 2), date(2025, 6, 8)
+
+
+@pytest.fixture
+def rates() -> ElectricityRates:
+    """Create electricity rates with a different value per period."""
+    return ElectricityRates(
+        consumption=ConsumptionRates(
+            peak=(0.155716, "€/kWh"),
+            flat=(0.088428, "€/kWh"),
+            valley=(0.05346, "€/kWh"),
+        ),
+        power=PowerRates(
+            peak=(0.101597, "€/kW day"),
+            flat=(0.101597, "€/kW day"),
+            valley=(0.033202, "€/kW day"),
+        ),
+    )
+
+
+@pytest.fixture
+def readings() -> list[tuple[datetime, float]]:
+    """Create one week of hourly readings of 1 kWh, starting on a Monday."""
+    start = datetime(2025, 6, 2)
+    return [(start + timedelta(hours=h), 1.0) for h in range(7 * 24)]
+
+
+def test_consumption_period():
+    """Test the consumption period of working days, weekends and holidays."""
+    assert consumption_period(datetime(2025, 6, 2, 10)) == "peak"
+    assert consumption_period(datetime(2025, 6, 2, 8)) == "flat"
+    assert consumption_period(datetime(2025, 6, 2, 23)) == "flat"
+    assert consumption_period(datetime(2025, 6, 2, 3)) == "valley"
+    assert consumption_period(datetime(2025, 6, 7, 10)) == "valley"
+    assert consumption_period(datetime(2025, 6, 2, 10), {date(2025, 6, 2)}) == "valley"
+
+
+def test_aggregate_profile(readings: list[tuple[datetime, float]]):
+    """Test that hourly readings are reduced to per-period statistics."""
+    aggregates = aggregate_profile(readings, START, END, 4.6, 2.3)
+    assert aggregates.energy_peak == 5 * 8
+    assert aggregates.energy_flat == 5 * 8
+    assert aggregates.energy_valley == 5 * 8 + 2 * 24
+    assert aggregates.days == 7
+    assert aggregates.coefficients()[3:] == pytest.approx((4.6 * 7, 0, 2.3 * 7))
+
+
+def test_aggregate_profile_billing_period(readings: list[tuple[datetime, float]]):
+    """Test that the billing days come from the billing period, not the readings."""
+    # A day without readings still counts as a billing day
+    gap = [(t, kwh) for t, kwh in readings if t.date() != date(2025, 6, 4)]
+    assert aggregate_profile(gap, START, END, 4.6, 4.6).days == 7
+    assert aggregate_profile([], START, END + timedelta(days=23), 1, 1).days == 30
+
+    with pytest.raises(ValueError):
+        aggregate_profile(readings, START, END - timedelta(days=1), 4.6, 4.6)
+    with pytest.raises(ValueError):
+        aggregate_profile([], END, START, 4.6, 4.6)
+
+
+def test_store_matches_direct_pricing(
+    readings: list[tuple[datetime, float]], rates: ElectricityRates
+):
+    """Test that pricing through the store matches pricing each reading."""
+    store = AggregateStore()
+    store.add("profile-1", aggregate_profile(readings, START, END, 3.45, 5.75))
+    store.add("profile-2", ProfileAggregates(energy_valley=100, days=30))
+
+    consumption = {
+        "peak": rates.consumption.peak[0],
+        "flat": rates.consumption.flat[0],
+        "valley": rates.consumption.valley[0],
+    }
+    expected = sum(kwh * consumption[consumption_period(t)] for t, kwh in readings)
+    # P1 (peak and flat) is charged once, at the published "punta y llano" rate
+    expected += 7 * (3.45 * rates.power.peak[0] + 5.75 * rates.power.valley[0])
+
+    bills = store.bills(rates)
+    assert bills["profile-1"] == pytest.approx(expected)
+    assert bills["profile-2"] == pytest.approx(100 * rates.consumption.valley[0])
+    assert store.price(rates) == [bills["profile-1"], bills["profile-2"]]
+
+
+def test_store_round_trip(
+    tmp_path: Path, readings: list[tuple[datetime, float]], rates: ElectricityRates
+):
+    """Test that a saved store prices profiles like the original one."""
+    store = AggregateStore()
+    for i in range(3):
+        store.add(
+            f"ES00{i}",
+            aggregate_profile(readings, START, END, i + 1.0, i + 0.5),
+        )
+    path = tmp_path / "aggregates.bin"
+    store.save(path)
+
+    loaded = AggregateStore.load(path)
+    assert len(loaded) == 3
+    assert loaded.ids == store.ids
+    assert loaded.price(rates) == store.price(rates)
+
+
+def test_store_load_truncated(tmp_path: Path):
+    """Test that loading a truncated store raises a ValueError."""
+    store = AggregateStore()
+    store.add("ES001", ProfileAggregates(energy_peak=1, days=1))
+    path = tmp_path / "aggregates.bin"
+    store.save(path)
+    path.write_bytes(path.read_bytes()[:-8])
+    with pytest.raises(ValueError):
+        AggregateStore.load(path)
@@ -0,0 +1,176 @@
+"""Tests for the columnar export in the columnar module."""
+
+import json
+import shutil
+from datetime import UTC, datetime
+from pathlib import Path
+
+import pyarrow as pa
+import pytest
+from typer.testing import CliRunner
+
+from src.web_scrapping import columnar, paths
+from src.web_scrapping.billing import AggregateStore, ProfileAggregates
+from src.web_scrapping.models import ElectricityRates
+from src.web_scrapping.output import encode_binary, rates_record
+from src.web_scrapping.records import RatesBatch
+
+
+@pytest.fixture
+def rates() -> ElectricityRates:
+    """Load the rates of the Milenial plan stored in the data directory."""
+    path = paths.data_dir / "milenial_rates.json"
+    return ElectricityRates.model_validate_json(path.read_bytes())
+
+
+def test_rates_table(rates: ElectricityRates):
+    """Test that records are flattened to one row per section and period."""
+    fetched_at = datetime(2025, 6, 1, tzinfo=UTC)
+    table = columnar.rates_table(
+        [rates_record("milenial", rates, fetched_at), rates_record("otro", rates)]
+    )
+    assert table.schema == columnar.RATES_SCHEMA
+    assert table.num_rows == 12
+    row = table.slice(3, 1).to_pylist()[0]
+    assert row == {
+        "plan": "milenial",
+        "section": "power",
+        "period": "peak",
+        "value": 0.101597,
+        "unit": "€/kW day",
+        "fetched_at": fetched_at,
+    }
+    assert table.column("plan").chunk(0).dictionary.to_pylist() == ["milenial", "otro"]
+
+
+@pytest.mark.parametrize("suffix", [".arrow", ".parquet"])
+def test_write_read_round_trip(tmp_path: Path, rates: ElectricityRates, suffix: str):
+    """Test that tables keep their schema and content through a file."""
+    table = columnar.rates_table([rates_record("milenial", rates)])
+    path = tmp_path / f"rates{suffix}"
+    columnar.write_table(table, path)
+    loaded = columnar.read_table(path)
+    assert loaded.schema == columnar.RATES_SCHEMA
+    assert loaded.equals(table)
+
+
+def test_read_arrow_is_memory_mapped(tmp_path: Path, rates: ElectricityRates):
+    """Test that reading an Arrow file does not allocate memory for its columns."""
+    table = columnar.rates_table([rates_record("milenial", rates)] * 1000)
+    path = tmp_path / "rates.arrow"
+    columnar.write_table(table, path)
+    allocated = pa.total_allocated_bytes()
+    loaded = columnar.read_table(path)
+    assert loaded.num_rows == 6000
+    assert pa.total_allocated_bytes() == allocated
+
+
+def test_read_records(tmp_path: Path, rates: ElectricityRates):
+    """Test that all the rate file types are read as records."""
+    shutil.copy(paths.data_dir / "milenial_rates.json", tmp_path)
+    fetched_at = datetime(2025, 6, 1, tzinfo=UTC)
+    (tmp_path / "rates.bin").write_bytes(
+        encode_binary(["otro"], [fetched_at], RatesBatch.from_rates([rates]))
+    )
+
+    records = [
+        *columnar.read_records(tmp_path / "milenial_rates.json"),
+        *columnar.read_records(tmp_path / "rates.bin"),
+    ]
+    assert [r["plan"] for r in records] == ["milenial", "otro"]
+    assert records[1]["fetched_at"] == fetched_at.isoformat()
+    assert all(ElectricityRates.model_validate(r) == rates for r in records)
+
+    with pytest.raises(ValueError):
+        list(columnar.read_records(tmp_path / "notes.txt"))
+
+
+def test_read_records_plan_key(tmp_path: Path, rates: ElectricityRates):
+    """Test that a plan gets the same name from every file type."""
+    shutil.copy(paths.data_dir / "discriminacion-horaria_rates.json", tmp_path)
+    fetched_at = datetime(2025, 6, 1, tzinfo=UTC)
+    (tmp_path / "rates.bin").write_bytes(
+        encode_binary(
+            ["Discriminación horaria"], [fetched_at], RatesBatch.from_rates([rates])
+        )
+    )
+    (tmp_path / "rates.ndjson").write_text(
+        json.dumps(rates_record("discriminación horaria", rates, fetched_at)) + "\n",
+        encoding="utf-8",
+    )
+
+    table = columnar.rates_table(
+        record
+        for name in ("discriminacion-horaria_rates.json", "rates.bin", "rates.ndjson")
+        for record in columnar.read_records(tmp_path / name)
+    )
+    assert set(table.column("plan").to_pylist()) == {"discriminacion-horaria"}
+
+
+def test_read_records_ndjson(tmp_path: Path, rates: ElectricityRates):
+    """Test that NDJSON stores are read, and other records raise a ValueError."""
+    fetched_at = datetime(2025, 6, 1, tzinfo=UTC)
+    store = tmp_path / "rates.ndjson"
+    record = {"snapshot": "2025-06.html", **rates_record("milenial", rates, fetched_at)}
+    store.write_text(json.dumps(record) + "\n\n", encoding="utf-8")
+    assert list(columnar.read_records(store)) == [
+        rates_record("milenial", rates, fetched_at)
+    ]
+
+    changes = tmp_path / "changes.ndjson"
+    changes.write_text('{"plan": "milenial", "section": "power"}\n', encoding="utf-8")
+    with pytest.raises(ValueError, match="line 1 of .*changes.ndjson"):
+        list(columnar.read_records(changes))
+
+
+def test_bills_table(rates: ElectricityRates):
+    """Test that bills are priced into a table."""
+    store = AggregateStore()
+    store.add("ES001", ProfileAggregates(energy_peak=100, days=30, power_p1=1))
+    table = columnar.bills_table(store, rates, "milenial")
+    assert table.schema == columnar.BILLS_SCHEMA
+    assert table.column("bill").to_pylist() == store.price(rates)
+
+
+def test_columnar_cli(tmp_path: Path):
+    """Test the export of the rate files in the data directory."""
+    destination = tmp_path / "rates.parquet"
+    result = CliRunner().invoke(
+        columnar.app,
+        [
+            str(paths.data_dir / "milenial_rates.json"),
+            str(paths.data_dir / "discriminacion-horaria_rates.json"),
+            "--destination",
+            str(destination),
+        ],
+    )
+    assert result.exit_code == 0
+    table = columnar.read_table(destination)
+    assert table.num_rows == 12
+    assert set(table.column("plan").to_pylist()) == {
+        "milenial",
+        "discriminacion-horaria",
+    }
+
+
+def test_columnar_cli_default_sources(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    """Test that the default export skips NDJSON files other than the rates store."""
+    shutil.copy(paths.data_dir / "milenial_rates.json", tmp_path)
+    monkeypatch.setattr(paths, "data_dir", tmp_path)
+    (tmp_path / "changes.ndjson").write_text('{"plan": "milenial"}\n', "utf-8")
+    destination = tmp_path / "rates.arrow"
+    result = CliRunner().invoke(columnar.app, ["--destination", str(destination)])
+    assert result.exit_code == 0
+    assert columnar.read_table(destination).num_rows == 6
+
+
+def test_columnar_cli_invalid_record(tmp_path: Path):
+    """Test that an invalid record is reported with its file."""
+    changes = tmp_path / "changes.ndjson"
+    changes.write_text('{"plan": "milenial"}\n', encoding="utf-8")
+    result = CliRunner().invoke(
+        columnar.app, [str(changes), "--destination", str(tmp_path / "rates.arrow")]
+    )
+    assert result.exit_code == 1
+    assert isinstance(result.exception, SystemExit)
+    assert "changes.ndjson" in result.output
@@ -0,0 +1,167 @@
+"""Tests for the detection of rate changes in the diff module."""
+
+import io
+import json
+import socket
+import threading
+from datetime import UTC, datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+from urllib.error import URLError
+
+import pytest
+
+from src.web_scrapping.diff import (
+    NdjsonFileSink,
+    RatesDiffer,
+    StreamSink,
+    WebhookSink,
+    sink_from_spec,
+)
+from src.web_scrapping.models import ConsumptionRates, ElectricityRates, PowerRates
+
+
+def _rates(consumption_peak: float = 0.155716) -> ElectricityRates:
+    """Create electricity rates with the given peak consumption rate."""
+    return ElectricityRates(
+        consumption=ConsumptionRates(
+            peak=(consumption_peak, "€/kWh"),
+            flat=(0.088428, "€/kWh"),
+            valley=(0.05346, "€/kWh"),
+        ),
+        power=PowerRates(
+            peak=(0.101597, "€/kW day"),
+            flat=(0.101597, "€/kW day"),
+            valley=(0.033202, "€/kW day"),
+        ),
+    )
+
+
+def test_update_emits_changed_periods_only(tmp_path: Path):
+    """Test that only the periods whose rate moved are emitted."""
+    events_path = tmp_path / "changes.ndjson"
+    differ = RatesDiffer(tmp_path / "state.json", [NdjsonFileSink(events_path)])
+    differ.seed("milenial", _rates())
+
+    timestamp = datetime(2025, 7, 1, tzinfo=UTC)
+    events = differ.update("milenial", _rates(0.2), timestamp)
+
+    assert len(events) == 1
+    event = events[0]
+    assert (event.plan, event.section, event.period) == (
+        "milenial",
+        "consumption",
+        "peak",
+    )
+    assert event.unit == "€/kWh"
+    assert (event.old, event.new) == (0.155716, 0.2)
+    assert event.delta == pytest.approx(0.2 - 0.155716)
+    assert event.relative_delta == pytest.approx((0.2 - 0.155716) / 0.155716)
+    assert event.timestamp == timestamp
+
+    with open(events_path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert records == [event.model_dump(mode="json")]
+
+
+def test_update_unchanged(tmp_path: Path):
+    """Test that unchanged rates emit nothing and do not rewrite the state."""
+    stream = io.StringIO()
+    differ = RatesDiffer(tmp_path / "state.json", [StreamSink(stream)])
+    differ.update("milenial", _rates())
+    state_mtime = (tmp_path / "state.json").stat().st_mtime_ns
+    stream.seek(0)
+    stream.truncate()
+
+    assert differ.update("milenial", _rates()) == []
+    assert stream.getvalue() == ""
+    assert (tmp_path / "state.json").stat().st_mtime_ns == state_mtime
+
+
+def test_update_new_plan(tmp_path: Path):
+    """Test that the first rates of a plan emit every period."""
+    differ = RatesDiffer(tmp_path / "state.json")
+    events = differ.update("milenial", _rates())
+    assert len(events) == 6
+    assert all(e.old is None and e.delta is None for e in events)
+
+
+def test_state_persists(tmp_path: Path):
+    """Test that a new differ compares against the rates stored by a previous one."""
+    RatesDiffer(tmp_path / "state.json").update("milenial", _rates())
+    differ = RatesDiffer(tmp_path / "state.json")
+    assert "milenial" in differ
+    assert differ.update("milenial", _rates()) == []
+    assert len(differ.update("milenial", _rates(0.3))) == 1
+
+
+def test_seed_persists(tmp_path: Path):
+    """Test that seeded rates are saved, including a plan without previous rates."""
+    differ = RatesDiffer(tmp_path / "state.json")
+    differ.seed("milenial", _rates())
+    differ.seed("otro", None)
+
+    differ = RatesDiffer(tmp_path / "state.json")
+    assert "milenial" in differ and "otro" in differ
+    assert differ.update("milenial", _rates()) == []
+    assert len(differ.update("otro", _rates())) == 6
+
+
+def test_update_retries_failed_delivery(tmp_path: Path):
+    """Test that events a sink failed to deliver are emitted again by a new differ."""
+    state = tmp_path / "state.json"
+    RatesDiffer(state).update("milenial", _rates())
+
+    # Reserve a port, then close it so the webhook refuses the connection
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    differ = RatesDiffer(state, [WebhookSink(f"http://127.0.0.1:{port}/hook")])
+    with pytest.raises(URLError):
+        differ.update("milenial", _rates(0.2))
+
+    stream = io.StringIO()
+    events = RatesDiffer(state, [StreamSink(stream)]).update("milenial", _rates(0.2))
+    assert [(e.old, e.new) for e in events] == [(0.155716, 0.2)]
+    assert json.loads(stream.getvalue())["new"] == 0.2
+    assert RatesDiffer(state).update("milenial", _rates(0.2)) == []
+
+
+def test_webhook_sink(tmp_path: Path):
+    """Test that events are posted to a webhook as a JSON array."""
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self) -> None:
+            length = int(self.headers["Content-Length"])
+            received.append(json.loads(self.rfile.read(length)))
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, format: str, *args: object) -> None:
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/hook"
+        differ = RatesDiffer(tmp_path / "state.json", [sink_from_spec(url)])
+        differ.seed("milenial", _rates())
+        differ.update("milenial", _rates(0.2))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert len(received) == 1
+    assert [e["new"] for e in received[0]] == [0.2]
+
+
+def test_sink_from_spec(tmp_path: Path):
+    """Test the creation of sinks from their specification."""
+    assert isinstance(sink_from_spec("-"), StreamSink)
+    assert isinstance(sink_from_spec("http://127.0.0.1:9000"), WebhookSink)
+    sink = sink_from_spec(str(tmp_path / "changes.ndjson"))
+    assert isinstance(sink, NdjsonFileSink)
+    with pytest.raises(ValueError):
+        WebhookSink("ftp://127.0.0.1")
@@ -0,0 +1,185 @@
+"""Tests for the memory accounting of the browser in the memory module."""
+
+import os
+import sys
+from collections.abc import Callable
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+import typer
+from pytest_mock import MockerFixture
+from selenium.common.exceptions import WebDriverException
+
+from src.web_scrapping import memory, parser
+
+
+def _fake_process(proc_root: Path, pid: int, ppid: int, rss_pages: int) -> None:
+    """Create the procfs entries of a fake process."""
+    directory = proc_root / str(pid)
+    directory.mkdir()
+    (directory / "stat").write_text(f"{pid} (chrome (renderer)) S {ppid} 1 1 0")
+    (directory / "statm").write_text(f"1000 {rss_pages} 10 1 0 100 0")
+
+
+@pytest.fixture
+def proc_root(tmp_path: Path) -> Path:
+    """Create a fake procfs with a driver, a browser and two renderers."""
+    _fake_process(tmp_path, 10, 1, 100)  # chromedriver
+    _fake_process(tmp_path, 11, 10, 1000)  # chrome
+    _fake_process(tmp_path, 12, 11, 500)  # renderer
+    _fake_process(tmp_path, 13, 11, 500)  # renderer
+    _fake_process(tmp_path, 20, 1, 9999)  # unrelated process
+    return tmp_path
+
+
+def test_process_tree(proc_root: Path):
+    """Test that the process tree includes all the descendants only."""
+    assert sorted(memory.process_tree(10, proc_root)) == [10, 11, 12, 13]
+    assert memory.process_tree(12, proc_root) == [12]
+
+
+def test_process_tree_rss(proc_root: Path):
+    """Test that the RSS of a process tree is the sum of its processes."""
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    assert memory.process_tree_rss(10, proc_root) == 2100 * page_size
+    assert memory.process_tree_rss(11, proc_root) == 2000 * page_size
+
+
+def test_process_tree_rss_without_proc(tmp_path: Path):
+    """Test that the RSS is zero when procfs is not available."""
+    assert memory.process_tree_rss(10, tmp_path / "missing") == 0
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="Requires /proc")
+def test_monitor_budget_exceeded():
+    """Test that the monitor reports a process tree exceeding its budget."""
+    calls = []
+    with memory.MemoryMonitor(
+        os.getpid(), budget_bytes=1, on_exceed=lambda: calls.append(True)
+    ) as monitor:
+        pass
+    assert monitor.exceeded
+    assert calls == [True]
+    assert monitor.stats.samples >= 1
+    assert monitor.stats.peak_bytes > 0
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="Requires /proc")
+def test_monitor_within_budget():
+    """Test that the monitor does not report a process tree within its budget."""
+    with memory.MemoryMonitor(os.getpid(), budget_bytes=2**50) as monitor:
+        monitor.sample()
+    assert not monitor.exceeded
+    assert monitor.stats.samples >= 2
+
+
+def test_chrome_options_low_memory():
+    """Test that the low-memory profile adds its flags to the default ones."""
+    default = parser._chrome_options()
+    low_memory = parser._chrome_options(low_memory=True)
+    assert default.arguments == [
+        "--headless",
+        "--disable-dev-shm-usage",
+        "--disable-gpu",
+    ]
+    assert low_memory.arguments == default.arguments + parser.LOW_MEMORY_ARGUMENTS
+    assert "--renderer-process-limit=1" in low_memory.arguments
+    assert low_memory.experimental_options["prefs"] == {
+        "profile.managed_default_content_settings.images": 2
+    }
+
+
+@pytest.fixture
+def mock_browser(mocker: MockerFixture) -> Callable[[list[bool]], list[MagicMock]]:
+    """
+    Mock the browser and its memory monitor for `get_html`.
+
+    Returns a function taking, for each browser started, whether it exceeds the
+    memory budget. A browser exceeding it is killed while loading the page, and the
+    others render the page. The function returns the mocked drivers.
+    """
+
+    def setup(exceeds: list[bool]) -> list[MagicMock]:
+        drivers = []
+        for exceeded in exceeds:
+            driver = MagicMock()
+            driver.service.process.pid = 100 + len(drivers)
+            driver.page_source = "<html>Milenial</html>"
+            if exceeded:
+                driver.get.side_effect = WebDriverException("chrome not reachable")
+            drivers.append(driver)
+        monitors = iter(exceeds)
+
+        class FakeMonitor:
+            """Memory monitor reporting the configured budget overruns."""
+
+            def __init__(
+                self,
+                pid: int,
+                budget_bytes: int | None,
+                on_exceed: Callable[[], None],
+                stats: memory.MemoryStats,
+            ) -> None:
+                self.exceeded = next(monitors)
+                self.on_exceed = on_exceed
+                stats.samples += 1
+
+            def __enter__(self) -> "FakeMonitor":
+                if self.exceeded:
+                    self.on_exceed()
+                return self
+
+            def __exit__(self, *args: object) -> None:
+                pass
+
+        mocker.patch.object(parser, "ChromeDriverManager")
+        mocker.patch.object(parser, "Service")
+        mocker.patch.object(parser, "WebDriverWait")
+        mocker.patch.object(parser.webdriver, "Chrome", side_effect=drivers)
+        mocker.patch.object(parser, "MemoryMonitor", FakeMonitor)
+        return drivers
+
+    return setup
+
+
+def test_get_html_recycles_browser(
+    mock_browser: Callable[[list[bool]], list[MagicMock]],
+    mocker: MockerFixture,
+    capsys: pytest.CaptureFixture,
+):
+    """Test that a browser exceeding the memory budget is killed and restarted."""
+    kill = mocker.patch.object(parser, "kill_process_tree")
+    drivers = mock_browser([True, False])
+    stats = memory.MemoryStats()
+
+    html = parser.get_html(memory_budget_mb=64, memory_stats=stats)
+
+    assert html == "<html>Milenial</html>"
+    kill.assert_called_once_with(100)
+    assert stats.recycles == 1
+    assert stats.samples == 2
+    drivers[0].quit.assert_called_once()
+    drivers[1].quit.assert_called_once()
+    assert "exceeded the memory budget of 64 MB and was restarted" in (
+        capsys.readouterr().err
+    )
+
+
+def test_get_html_runs_out_of_recycles(
+    mock_browser: Callable[[list[bool]], list[MagicMock]],
+    mocker: MockerFixture,
+    capsys: pytest.CaptureFixture,
+):
+    """Test that `get_html` exits once every browser exceeded the memory budget."""
+    kill = mocker.patch.object(parser, "kill_process_tree")
+    drivers = mock_browser([True, True, True])
+    stats = memory.MemoryStats()
+
+    with pytest.raises(typer.Exit):
+        parser.get_html(memory_budget_mb=64, max_recycles=2, memory_stats=stats)
+
+    assert [c.args for c in kill.call_args_list] == [(100,), (101,), (102,)]
+    assert stats.recycles == 2
+    assert all(driver.quit.called for driver in drivers)
+    assert "exceeded the memory budget of 64 MB 3 times" in capsys.readouterr().err
@@ -0,0 +1,127 @@
+"""Tests for the output sinks in the output module."""
+
+import io
+import json
+import os
+import stat
+from datetime import UTC, datetime
+from pathlib import Path
+
+import pytest
+from pytest_mock import MockerFixture
+
+from src.web_scrapping.models import ConsumptionRates, ElectricityRates, PowerRates
+from src.web_scrapping.output import (
+    atomic_write,
+    decode_binary,
+    encode_binary,
+    rates_record,
+    write_ndjson,
+)
+from src.web_scrapping.records import RatesBatch
+
+
+@pytest.fixture
+def rates() -> ElectricityRates:
+    """Create electricity rates with a different value per period."""
+    return ElectricityRates(
+        consumption=ConsumptionRates(
+            peak=(0.155716, "€/kWh"),
+            flat=(0.088428, "€/kWh"),
+            valley=(0.05346, "€/kWh"),
+        ),
+        power=PowerRates(
+            peak=(0.101597, "€/kW day"),
+            flat=(0.101597, "€/kW day"),
+            valley=(0.033202, "€/kW day"),
+        ),
+    )
+
+
+def test_atomic_write_replaces_file(tmp_path: Path):
+    """Test that an atomic write replaces the previous content."""
+    path = tmp_path / "rates.json"
+    path.write_text("old", encoding="utf-8")
+    atomic_write(path, "new €")
+    assert path.read_text(encoding="utf-8") == "new €"
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_atomic_write_keeps_file_on_failure(tmp_path: Path, mocker: MockerFixture):
+    """Test that a failed atomic write leaves the previous content untouched."""
+    path = tmp_path / "rates.json"
+    path.write_text("old", encoding="utf-8")
+    mocker.patch("src.web_scrapping.output.os.replace", side_effect=OSError("boom"))
+    with pytest.raises(OSError):
+        atomic_write(path, "new")
+    assert path.read_text(encoding="utf-8") == "old"
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_atomic_write_mode(tmp_path: Path):
+    """Test that an atomic write uses the umask mode, or keeps the existing one."""
+    mask = os.umask(0o022)
+    try:
+        new = tmp_path / "new.json"
+        atomic_write(new, "new")
+        assert stat.S_IMODE(new.stat().st_mode) == 0o644
+
+        existing = tmp_path / "existing.json"
+        existing.write_text("old", encoding="utf-8")
+        existing.chmod(0o640)
+        atomic_write(existing, "new")
+        assert stat.S_IMODE(existing.stat().st_mode) == 0o640
+    finally:
+        os.umask(mask)
+
+
+def test_write_ndjson(rates: ElectricityRates):
+    """Test that records are written one per line."""
+    fetched_at = datetime(2025, 6, 1, tzinfo=UTC)
+    stream = io.StringIO()
+    write_ndjson(
+        [rates_record("milenial", rates, fetched_at), rates_record("otro", rates)],
+        stream,
+    )
+    lines = stream.getvalue().splitlines()
+    assert len(lines) == 2
+    record = json.loads(lines[0])
+    assert record["plan"] == "milenial"
+    assert record["fetched_at"] == "2025-06-01T00:00:00+00:00"
+    assert ElectricityRates.model_validate(record) == rates
+
+
+def test_binary_round_trip(rates: ElectricityRates):
+    """Test that the binary format decodes to the encoded observations."""
+    fetched_at = [datetime(2025, 6, 1, tzinfo=UTC), datetime(2025, 7, 1, tzinfo=UTC)]
+    data = encode_binary(
+        ["milenial", "discriminación horaria"],
+        fetched_at,
+        RatesBatch.from_rates([rates, rates]),
+    )
+    plans, timestamps, batch = decode_binary(data)
+    assert plans == ["milenial", "discriminación horaria"]
+    assert timestamps == fetched_at
+    assert batch.to_rates() == [rates, rates]
+
+
+def test_binary_invalid_data():
+    """Test that decoding data in another format raises a ValueError."""
+    with pytest.raises(ValueError):
+        decode_binary(b'{"consumption": {}}')
+
+
+def test_binary_truncated_data(rates: ElectricityRates):
+    """Test that decoding truncated data raises a ValueError at every length."""
+    data = encode_binary(
+        ["milenial"], [datetime(2025, 6, 1, tzinfo=UTC)], RatesBatch.from_rates([rates])
+    )
+    for length in range(4, len(data)):
+        with pytest.raises(ValueError):
+            decode_binary(data[:length])
+
+
+def test_binary_length_mismatch(rates: ElectricityRates):
+    """Test that encoding mismatched plans and rates raises a ValueError."""
+    with pytest.raises(ValueError):
+        encode_binary(["milenial"], [], RatesBatch.from_rates([rates]))
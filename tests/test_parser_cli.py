@@ -1,5 +1,7 @@
 """Tests for the CLI interface of the parser module."""
 
+import json
+import socket
 import sys
 from pathlib import Path
 
@@ -9,6 +11,8 @@ from pytest_mock import MockerFixture
 from typer.testing import CliRunner
 
 from src.web_scrapping import parser
+from src.web_scrapping.memory import MemoryStats
+from src.web_scrapping.output import decode_binary
 from src.web_scrapping.parser import ConsumptionRates, ElectricityRates, PowerRates
 
 
@@ -112,7 +116,7 @@ def test_main_cli_html_error(cli_runner: CliRunner, mocker: MockerFixture) -> No
     """Test main function CLI with HTML retrieval error."""
 
     # Setup
-    def mock_get_html():
+    def mock_get_html(**kwargs: object):
         print(
             "ERROR: Could not find any reference to the 'Milenial' plan "
             "in the online version of the A tu Lado Energía website "
@@ -180,3 +184,278 @@ def test_main_cli_file_error(
 
     # Cleanup
     tmp_path.chmod(0o755)
+
+
+def test_main_cli_compact_output(
+    cli_runner: CliRunner,
+    mocker: MockerFixture,
+    tmp_path: Path,
+    mock_rates: ElectricityRates,
+) -> None:
+    """Test main function CLI writing compact JSON for several plans."""
+    # Setup
+    mocker.patch(
+        "src.web_scrapping.parser.get_html",
+        return_value="<html><body>Test</body></html>",
+    )
+    mocker.patch("src.web_scrapping.parser.parse_rates", return_value=mock_rates)
+    mocker.patch("src.web_scrapping.parser.paths.data_dir", tmp_path)
+
+    # Execute
+    result = cli_runner.invoke(
+        parser.app, ["--plan", "milenial", "--plan", "otro plan", "--output", "compact"]
+    )
+
+    # Assert
+    assert result.exit_code == 0
+    for name in ("milenial", "otro-plan"):
+        content = (tmp_path / f"{name}_rates.json").read_text(encoding="utf-8")
+        assert "\n" not in content
+        assert ElectricityRates.model_validate_json(content) == mock_rates
+    # No temporary files are left behind
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "milenial_rates.json",
+        "otro-plan_rates.json",
+    ]
+
+
+def test_main_cli_ndjson_output(
+    cli_runner: CliRunner,
+    mocker: MockerFixture,
+    tmp_path: Path,
+    mock_rates: ElectricityRates,
+) -> None:
+    """Test main function CLI streaming NDJSON to stdout."""
+    # Setup
+    mocker.patch(
+        "src.web_scrapping.parser.get_html",
+        return_value="<html><body>Test</body></html>",
+    )
+    mocker.patch("src.web_scrapping.parser.parse_rates", return_value=mock_rates)
+    mocker.patch("src.web_scrapping.parser.paths.data_dir", tmp_path)
+
+    # Execute
+    result = cli_runner.invoke(
+        parser.app, ["--plan", "milenial", "--plan", "otro", "--output", "ndjson"]
+    )
+
+    # Assert
+    assert result.exit_code == 0
+    lines = result.stdout.splitlines()
+    assert len(lines) == 2
+    records = [json.loads(line) for line in lines]
+    assert [r["plan"] for r in records] == ["milenial", "otro"]
+    for record in records:
+        assert ElectricityRates.model_validate(record) == mock_rates
+    assert not any(tmp_path.iterdir())
+
+
+def test_main_cli_binary_output(
+    cli_runner: CliRunner,
+    mocker: MockerFixture,
+    tmp_path: Path,
+    mock_rates: ElectricityRates,
+) -> None:
+    """Test main function CLI writing the compact binary format."""
+    # Setup
+    mocker.patch(
+        "src.web_scrapping.parser.get_html",
+        return_value="<html><body>Test</body></html>",
+    )
+    mocker.patch("src.web_scrapping.parser.parse_rates", return_value=mock_rates)
+    mocker.patch("src.web_scrapping.parser.paths.data_dir", tmp_path)
+
+    # Execute
+    result = cli_runner.invoke(parser.app, ["--output", "binary"])
+
+    # Assert
+    assert result.exit_code == 0
+    plans, _, batch = decode_binary((tmp_path / "rates.bin").read_bytes())
+    assert plans == ["milenial"]
+    assert batch.to_rates() == [mock_rates]
+
+
+def test_main_cli_memory_summary(
+    cli_runner: CliRunner,
+    mocker: MockerFixture,
+    tmp_path: Path,
+    mock_rates: ElectricityRates,
+) -> None:
+    """Test main function CLI reporting the peak memory of the browser."""
+
+    # Setup
+    def mock_get_html(memory_stats: MemoryStats, **kwargs: object) -> str:
+        assert kwargs["low_memory"] is True
+        assert kwargs["memory_budget_mb"] == 256.0
+        memory_stats.peak_bytes = 200 * 2**20
+        memory_stats.samples = 5
+        memory_stats.recycles = 1
+        return "<html><body>Test</body></html>"
+
+    mocker.patch("src.web_scrapping.parser.get_html", side_effect=mock_get_html)
+    mocker.patch("src.web_scrapping.parser.parse_rates", return_value=mock_rates)
+    mocker.patch("src.web_scrapping.parser.paths.data_dir", tmp_path)
+
+    # Execute
+    result = cli_runner.invoke(parser.app, ["--low-memory", "--memory-budget", "256"])
+
+    # Assert
+    assert result.exit_code == 0
+    assert "Peak browser memory: 200.0 MB (5 samples, 1 restarts)" in result.stdout
+
+
+def test_main_cli_base_url(
+    cli_runner: CliRunner,
+    mocker: MockerFixture,
+    tmp_path: Path,
+    mock_rates: ElectricityRates,
+) -> None:
+    """Test main function CLI fetching the website from a custom base URL."""
+    # Setup
+    get_html = mocker.patch(
+        "src.web_scrapping.parser.get_html",
+        return_value="<html><body>Test</body></html>",
+    )
+    mocker.patch("src.web_scrapping.parser.parse_rates", return_value=mock_rates)
+    mocker.patch("src.web_scrapping.parser.paths.data_dir", tmp_path)
+
+    # Execute
+    result = cli_runner.invoke(
+        parser.app, ["--base-url", "http://127.0.0.1:8000", "--timeout", "2"]
+    )
+
+    # Assert
+    assert result.exit_code == 0
+    assert get_html.call_args.kwargs["base_url"] == "http://127.0.0.1:8000"
+    assert get_html.call_args.kwargs["timeout"] == 2
+
+
+def test_main_cli_changes(
+    cli_runner: CliRunner,
+    mocker: MockerFixture,
+    tmp_path: Path,
+    mock_rates: ElectricityRates,
+) -> None:
+    """Test main function CLI emitting the rate changes since the last run."""
+    # Setup
+    previous = mock_rates.model_copy(
+        update={
+            "power": PowerRates(
+                peak=(0.1234, "€/kW day"),
+                flat=(0.1234, "€/kW day"),
+                valley=(0.1, "€/kW day"),
+            )
+        }
+    )
+    (tmp_path / "milenial_rates.json").write_text(previous.model_dump_json())
+    mocker.patch(
+        "src.web_scrapping.parser.get_html",
+        return_value="<html><body>Test</body></html>",
+    )
+    mocker.patch("src.web_scrapping.parser.parse_rates", return_value=mock_rates)
+    mocker.patch("src.web_scrapping.parser.paths.data_dir", tmp_path)
+    changes = tmp_path / "changes.ndjson"
+
+    # Execute
+    first = cli_runner.invoke(parser.app, ["--changes", str(changes)])
+    second = cli_runner.invoke(parser.app, ["--changes", str(changes)])
+
+    # Assert
+    assert first.exit_code == 0
+    assert second.exit_code == 0
+    with open(changes, encoding="utf-8") as f:
+        events = [json.loads(line) for line in f]
+    assert len(events) == 1
+    assert events[0]["section"] == "power"
+    assert events[0]["period"] == "valley"
+    assert (events[0]["old"], events[0]["new"]) == (0.1, 0.1234)
+
+
+def test_main_cli_changes_sink_error(
+    cli_runner: CliRunner,
+    mocker: MockerFixture,
+    tmp_path: Path,
+    mock_rates: ElectricityRates,
+) -> None:
+    """Test that a failing sink does not prevent the rates from being written."""
+    # Setup
+    mocker.patch(
+        "src.web_scrapping.parser.get_html",
+        return_value="<html><body>Test</body></html>",
+    )
+    mocker.patch("src.web_scrapping.parser.parse_rates", return_value=mock_rates)
+    mocker.patch("src.web_scrapping.parser.paths.data_dir", tmp_path)
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    changes = tmp_path / "changes.ndjson"
+
+    # Execute
+    failed = cli_runner.invoke(
+        parser.app, ["--changes", f"http://127.0.0.1:{port}/hook"]
+    )
+    retried = cli_runner.invoke(parser.app, ["--changes", str(changes)])
+
+    # Assert
+    assert failed.exit_code == 1
+    assert "Could not emit the rate changes of the 'milenial' plan" in failed.output
+    saved = (tmp_path / "milenial_rates.json").read_text(encoding="utf-8")
+    assert ElectricityRates.model_validate_json(saved) == mock_rates
+    assert retried.exit_code == 0
+    with open(changes, encoding="utf-8") as f:
+        assert len(f.readlines()) == 6
+
+
+def test_main_cli_changes_saves_seed(
+    cli_runner: CliRunner,
+    mocker: MockerFixture,
+    tmp_path: Path,
+    mock_rates: ElectricityRates,
+) -> None:
+    """Test that the rates seeded from an unchanged rates file are saved."""
+    # Setup
+    (tmp_path / "milenial_rates.json").write_text(mock_rates.model_dump_json())
+    mocker.patch(
+        "src.web_scrapping.parser.get_html",
+        return_value="<html><body>Test</body></html>",
+    )
+    mocker.patch("src.web_scrapping.parser.parse_rates", return_value=mock_rates)
+    mocker.patch("src.web_scrapping.parser.paths.data_dir", tmp_path)
+    changes = tmp_path / "changes.ndjson"
+
+    # Execute
+    result = cli_runner.invoke(parser.app, ["--changes", str(changes)])
+
+    # Assert
+    assert result.exit_code == 0
+    assert not changes.exists()
+    state = json.loads((tmp_path / ".rates_state.json").read_text(encoding="utf-8"))
+    assert list(state) == ["milenial"]
+
+
+def test_main_cli_ndjson_changes_to_stderr(
+    mocker: MockerFixture,
+    tmp_path: Path,
+    mock_rates: ElectricityRates,
+) -> None:
+    """Test that "-" changes go to stderr when the records are streamed to stdout."""
+    # Setup
+    mocker.patch(
+        "src.web_scrapping.parser.get_html",
+        return_value="<html><body>Test</body></html>",
+    )
+    mocker.patch("src.web_scrapping.parser.parse_rates", return_value=mock_rates)
+    mocker.patch("src.web_scrapping.parser.paths.data_dir", tmp_path)
+
+    # Execute
+    result = CliRunner(mix_stderr=False).invoke(
+        parser.app, ["--output", "ndjson", "--changes", "-"]
+    )
+
+    # Assert
+    assert result.exit_code == 0
+    records = [json.loads(line) for line in result.stdout.splitlines()]
+    assert [record["plan"] for record in records] == ["milenial"]
+    events = [json.loads(line) for line in result.stderr.splitlines()]
+    assert len(events) == 6
+    assert all(event["plan"] == "milenial" for event in events)
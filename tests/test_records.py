@@ -0,0 +1,97 @@
+"""Tests for the compact rates records in the records module."""
+
+import pytest
+
+from src.web_scrapping.parser import ConsumptionRates, ElectricityRates, PowerRates
+from src.web_scrapping.records import FIELDS, UNITS, RatesBatch, RatesRecord
+
+
+@pytest.fixture
+def rates() -> ElectricityRates:
+    """Create electricity rates with a different value per period."""
+    return ElectricityRates(
+        consumption=ConsumptionRates(
+            peak=(0.155716, "€/kWh"),
+            flat=(0.088428, "€/kWh"),
+            valley=(0.05346, "€/kWh"),
+        ),
+        power=PowerRates(
+            peak=(0.101597, "€/kW day"),
+            flat=(0.101597, "€/kW day"),
+            valley=(0.033202, "€/kW day"),
+        ),
+    )
+
+
+def test_record_round_trip(rates: ElectricityRates):
+    """Test that a record converts losslessly to and from electricity rates."""
+    record = RatesRecord.from_rates(rates)
+    assert record.values() == (
+        0.155716,
+        0.088428,
+        0.05346,
+        0.101597,
+        0.101597,
+        0.033202,
+    )
+    assert record.to_rates() == rates
+    assert record.to_rates().model_dump() == rates.model_dump()
+
+
+def test_record_has_no_instance_dict(rates: ElectricityRates):
+    """Test that records are slotted."""
+    record = RatesRecord.from_rates(rates)
+    assert not hasattr(record, "__dict__")
+    with pytest.raises(AttributeError):
+        record.unit = "€/kWh"
+
+
+def test_batch_round_trip(rates: ElectricityRates):
+    """Test that a batch converts losslessly to and from electricity rates."""
+    batch = RatesBatch.from_rates([rates, rates, rates])
+    assert len(batch) == 3
+    assert batch.nbytes == 3 * len(FIELDS) * 8
+    assert batch.units == UNITS
+    assert batch[-1] == RatesRecord.from_rates(rates)
+    assert batch.to_rates() == [rates, rates, rates]
+
+
+def test_batch_index_out_of_range(rates: ElectricityRates):
+    """Test that indexing past the end of a batch raises an IndexError."""
+    batch = RatesBatch.from_rates([rates])
+    with pytest.raises(IndexError):
+        batch[1]
+
+
+def test_batch_invalid_length():
+    """Test that a batch rejects values that do not fill whole observations."""
+    with pytest.raises(ValueError):
+        RatesBatch([0.1] * 7)
+
+
+def test_batch_validate_invalid_value(rates: ElectricityRates):
+    """Test that a batch with a non-positive value is rejected."""
+    batch = RatesBatch.from_rates([rates])
+    batch.append(RatesRecord(0.1, 0.1, 0.1, 0.1, -0.1, 0.1))
+    with pytest.raises(ValueError) as exc_info:
+        batch.validate()
+    assert str(exc_info.value) == "Power rate values must be positive"
+
+
+def test_batch_validate_nan_does_not_hide_invalid_value():
+    """Test that a leading NaN does not hide a non-positive value."""
+    batch = RatesBatch(
+        [float("nan"), 0.1, 0.1, 0.1, 0.1, 0.1, -1, 0.1, 0.1, 0.1, 0.1, 0.1]
+    )
+    with pytest.raises(ValueError) as exc_info:
+        batch.validate()
+    assert str(exc_info.value) == "Consumption rate values must be positive"
+
+
+def test_batch_validate_invalid_unit(rates: ElectricityRates):
+    """Test that a batch with a wrong section unit is rejected."""
+    batch = RatesBatch.from_rates([rates])
+    batch.units["consumption"] = "€/kW day"
+    with pytest.raises(ValueError) as exc_info:
+        batch.validate()
+    assert str(exc_info.value) == "Consumption rate units must be €/kWh"
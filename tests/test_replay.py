@@ -0,0 +1,88 @@
+"""Tests for the local replay server in the replay module."""
+
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+from bs4 import BeautifulSoup
+
+from src.web_scrapping import parser, paths
+from src.web_scrapping.replay import ReplayConfig, ReplayServer, delay_rendering
+
+
+def _fetch(url: str) -> tuple[int, str]:
+    """Fetch a URL, returning its status and content."""
+    try:
+        with urllib.request.urlopen(url, timeout=10) as response:  # noqa: S310
+            return response.status, response.read().decode("utf-8")
+    except urllib.error.HTTPError as e:
+        return e.code, ""
+
+
+def test_replay_serves_snapshot():
+    """Test that the server replays the offline copy of the website."""
+    with ReplayServer() as server:
+        status, html = _fetch(f"{server.url}/tarifas")
+    assert status == 200
+    assert html == paths.static_html.read_text(encoding="utf-8")
+    assert parser.parse_rates(html, "milenial").consumption.peak == (
+        0.089022,
+        "€/kWh",
+    )
+
+
+def test_replay_unknown_path():
+    """Test that the server answers unknown paths with a 404."""
+    with ReplayServer() as server:
+        status, _ = _fetch(f"{server.url}/unknown")
+    assert status == 404
+
+
+def test_replay_latency():
+    """Test that the server delays its responses."""
+    with ReplayServer(config=ReplayConfig(latency=0.3)) as server:
+        start = time.perf_counter()
+        _fetch(f"{server.url}/tarifas")
+        elapsed = time.perf_counter() - start
+    assert elapsed >= 0.3
+
+
+def test_replay_bandwidth():
+    """Test that the server throttles its responses."""
+    size = paths.static_html.stat().st_size
+    with ReplayServer(config=ReplayConfig(bandwidth=size * 2)) as server:
+        start = time.perf_counter()
+        status, _ = _fetch(f"{server.url}/tarifas")
+        elapsed = time.perf_counter() - start
+    assert status == 200
+    assert elapsed >= 0.4
+
+
+def test_replay_failures_are_deterministic():
+    """Test that injected failures follow the same sequence for the same seed."""
+    config = ReplayConfig(failure_rate=0.5, failure_status=502, seed=42)
+    sequences = []
+    for _ in range(2):
+        with ReplayServer(config=config) as server:
+            sequences.append([_fetch(f"{server.url}/tarifas")[0] for _ in range(20)])
+    assert sequences[0] == sequences[1]
+    assert set(sequences[0]) == {200, 502}
+
+
+def test_delay_rendering():
+    """Test that the body is moved into a script rendering it after a delay."""
+    html = delay_rendering(
+        "<html><body><p>Consumo: 0,1 €/kWh</p><script>a='</p>'</script></body></html>",
+        1.5,
+    )
+    assert BeautifulSoup(html, "html.parser").body.find("p") is None
+    assert "setTimeout" in html
+    assert "1500);" in html
+    assert "<\\/script>" in html
+
+
+def test_invalid_config():
+    """Test that invalid server settings are rejected."""
+    with pytest.raises(ValueError):
+        ReplayConfig(failure_rate=2)
@@ -0,0 +1,164 @@
+"""Tests for the incremental parsing of a snapshot directory in the watch module."""
+
+import json
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+from pytest_mock import MockerFixture
+from typer.testing import CliRunner
+
+from src.web_scrapping import paths, watch
+from src.web_scrapping.models import ElectricityRates
+
+
+@pytest.fixture
+def snapshots(tmp_path: Path) -> Path:
+    """Create a drop directory holding two copies of the offline website."""
+    directory = tmp_path / "web"
+    directory.mkdir()
+    shutil.copy(paths.static_html, directory / "2025-05.html")
+    shutil.copy(paths.static_html, directory / "2025-06.html")
+    return directory
+
+
+def _read_store(store: Path) -> list[dict]:
+    """Read the records of an NDJSON store."""
+    with open(store, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_scan_parses_new_snapshots_once(snapshots: Path, tmp_path: Path):
+    """Test that snapshots are parsed once and skipped on the next scans."""
+    store, manifest = tmp_path / "rates.ndjson", tmp_path / "manifest.ndjson"
+
+    assert watch.scan(snapshots, store, manifest, ["milenial"], workers=2) == 2
+    assert watch.scan(snapshots, store, manifest, ["milenial"], workers=2) == 0
+
+    records = _read_store(store)
+    assert [r["snapshot"] for r in records] == ["2025-05.html", "2025-06.html"]
+    assert all(r["plan"] == "milenial" for r in records)
+    rates = ElectricityRates.model_validate(records[0])
+    assert rates.consumption.peak == (0.089022, "€/kWh")
+
+
+def test_scan_reparses_changed_snapshots_only(snapshots: Path, tmp_path: Path):
+    """Test that touched snapshots are skipped and modified ones are parsed again."""
+    store, manifest = tmp_path / "rates.ndjson", tmp_path / "manifest.ndjson"
+    watch.scan(snapshots, store, manifest, ["milenial"], workers=1)
+
+    # Same content, new modification time
+    os.utime(snapshots / "2025-05.html", ns=(0, 0))
+    assert watch.scan(snapshots, store, manifest, ["milenial"], workers=1) == 0
+
+    # New content
+    with open(snapshots / "2025-06.html", "a", encoding="utf-8") as f:
+        f.write("<!-- updated -->")
+    shutil.copy(paths.static_html, snapshots / "2025-07.html")
+    assert watch.scan(snapshots, store, manifest, ["milenial"], workers=1) == 2
+
+    records = _read_store(store)
+    assert [r["snapshot"] for r in records] == [
+        "2025-05.html",
+        "2025-06.html",
+        "2025-06.html",
+        "2025-07.html",
+    ]
+
+
+def test_scan_discards_uncommitted_records(snapshots: Path, tmp_path: Path):
+    """Test that records appended after the last commit are dropped on resume."""
+    store, manifest = tmp_path / "rates.ndjson", tmp_path / "manifest.ndjson"
+    watch.scan(snapshots, store, manifest, ["milenial"], workers=1)
+    committed = store.read_bytes()
+
+    # Simulate a run killed halfway through writing a new snapshot
+    shutil.copy(paths.static_html, snapshots / "2025-07.html")
+    with open(store, "a", encoding="utf-8") as f:
+        f.write('{"snapshot": "2025-07.html", "pl')
+
+    assert watch.scan(snapshots, store, manifest, ["milenial"], workers=1) == 1
+    assert store.read_bytes().startswith(committed)
+    assert [r["snapshot"] for r in _read_store(store)][-1] == "2025-07.html"
+    assert len(_read_store(store)) == 3
+
+
+def test_watch_dir_cli_once(snapshots: Path, tmp_path: Path):
+    """Test the watch-dir command scanning a directory once."""
+    store = tmp_path / "rates.ndjson"
+    result = CliRunner().invoke(
+        watch.app,
+        ["watch-dir", str(snapshots), "--store", str(store), "--once"],
+    )
+    assert result.exit_code == 0
+    assert len(_read_store(store)) == 2
+    assert (snapshots / ".watch-manifest.ndjson").exists()
+
+
+def test_scan_skips_unreadable_snapshots(snapshots: Path, tmp_path: Path):
+    """Test that a snapshot that is not UTF-8 does not block the other ones."""
+    store, manifest = tmp_path / "rates.ndjson", tmp_path / "manifest.ndjson"
+    (snapshots / "2025-04.html").write_bytes(b"\xff\xfe")
+
+    assert watch.scan(snapshots, store, manifest, ["milenial"], workers=1) == 3
+    assert watch.scan(snapshots, store, manifest, ["milenial"], workers=1) == 0
+    assert [r["snapshot"] for r in _read_store(store)] == [
+        "2025-05.html",
+        "2025-06.html",
+    ]
+    assert "2025-04.html" in watch.Manifest.load(manifest).files
+
+
+def test_manifest_is_appended_and_compacted(snapshots: Path, tmp_path: Path):
+    """Test that commits append to the manifest, which is compacted when stale."""
+    store, manifest = tmp_path / "rates.ndjson", tmp_path / "manifest.ndjson"
+    watch.scan(snapshots, store, manifest, ["milenial"], workers=1, chunk_size=1)
+    first = manifest.read_bytes()
+    assert len(first.splitlines()) == 2
+
+    for ns in (1, 2):
+        os.utime(snapshots / "2025-05.html", ns=(ns, ns))
+        os.utime(snapshots / "2025-06.html", ns=(ns, ns))
+        watch.scan(snapshots, store, manifest, ["milenial"], workers=1)
+    assert manifest.read_bytes().startswith(first)
+    assert len(manifest.read_bytes().splitlines()) == 6
+
+    loaded = watch.Manifest.load(manifest)
+    assert loaded.files["2025-05.html"].mtime_ns == 2
+    assert loaded.store_size == store.stat().st_size
+
+    # The stale lines are dropped on the next scan, keeping the latest states
+    assert watch.scan(snapshots, store, manifest, ["milenial"], workers=1) == 0
+    assert len(manifest.read_bytes().splitlines()) == 2
+    compacted = watch.Manifest.load(manifest)
+    assert (compacted.files, compacted.store_size) == (loaded.files, loaded.store_size)
+
+
+def test_manifest_ignores_partial_line(snapshots: Path, tmp_path: Path):
+    """Test that a manifest line cut by a killed run is ignored and overwritten."""
+    store, manifest = tmp_path / "rates.ndjson", tmp_path / "manifest.ndjson"
+    watch.scan(snapshots, store, manifest, ["milenial"], workers=1)
+    with open(manifest, "a", encoding="utf-8") as f:
+        f.write('{"snapshot":"2025-07.html","si')
+
+    shutil.copy(paths.static_html, snapshots / "2025-07.html")
+    assert watch.scan(snapshots, store, manifest, ["milenial"], workers=1) == 1
+    assert len(manifest.read_bytes().splitlines()) == 3
+    assert len(watch.Manifest.load(manifest).files) == 3
+
+
+def test_manifest_append_does_not_reread(tmp_path: Path, mocker: MockerFixture):
+    """Test that appending drops a partial line found on load, without rereading."""
+    path = tmp_path / "manifest.ndjson"
+    entry = watch.ManifestEntry(size=1, mtime_ns=1, sha256="0")
+    watch.Manifest().append(path, [("a.html", entry)])
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"snapshot":"b.ht')
+
+    manifest = watch.Manifest.load(path)
+    read_bytes = mocker.spy(Path, "read_bytes")
+    manifest.append(path, [("b.html", entry)])
+    manifest.append(path, [("c.html", entry)])
+    assert read_bytes.call_count == 0
+    assert list(watch.Manifest.load(path).files) == ["a.html", "b.html", "c.html"]